@@ -0,0 +1,62 @@
+"""
+Сравнение двух результатов benchmarks/run.py.
+
+    python benchmarks/compare.py old.json new.json [--threshold 10]
+
+Код возврата 1, если p95 или число запросов какого-то сценария выросли
+больше порога (в процентах).
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'queries', 'peak_kib')
+GUARDED = ('p95_ms', 'queries')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def change(old, new):
+    if old is None or new is None:
+        return None
+    if not old:
+        return 0.0 if not new else float('inf')
+    return (new - old) / old * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10)
+    options = parser.parse_args()
+    old, new = load(options.old), load(options.new)
+    print(f'{old.get("commit")} -> {new.get("commit")}')
+    regressed = False
+    for name, after in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            print(f'{name:<14} новый сценарий')
+            continue
+        cells = []
+        for metric in METRICS:
+            delta = change(before.get(metric), after.get(metric))
+            if delta is None:
+                continue
+            mark = ''
+            if metric in GUARDED and delta > options.threshold:
+                mark = ' !'
+                regressed = True
+            cells.append(
+                f'{metric} {before[metric]} -> {after[metric]} '
+                f'({delta:+.1f}%){mark}'
+            )
+        print(f'{name:<14} ' + '; '.join(cells))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
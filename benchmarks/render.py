@@ -0,0 +1,122 @@
+"""
+Время отрисовки главной страницы (10 постов) с кешируемым загрузчиком
+шаблонов и без него.
+
+База не нужна: посты, авторы и группы создаются в памяти, а кеш
+фрагментов отключён, чтобы каждый проход отрисовывал ленту целиком.
+
+    python benchmarks/render.py --renders 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.core.paginator import Paginator  # noqa: E402
+from django.template import RequestContext  # noqa: E402
+from django.template.backends.django import DjangoTemplates  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from posts.models import Group, Post, User  # noqa: E402
+from run import percentile  # noqa: E402
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def make_engine(cached):
+    """Движок с настройками проекта и заданными загрузчиками."""
+    config = settings.TEMPLATES[0]
+    loaders = [('django.template.loaders.cached.Loader', LOADERS)]
+    return DjangoTemplates({
+        'NAME': 'benchmark',
+        'DIRS': config['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **config['OPTIONS'],
+            'loaders': loaders if cached else LOADERS,
+        },
+    }).engine
+
+
+def index_context(posts):
+    users = [
+        User(pk=i, username=f'user{i}', first_name='Имя', last_name='Автор')
+        for i in range(1, 4)
+    ]
+    group = Group(pk=1, title='Группа', slug='group')
+    post_list = [
+        Post(
+            pk=i, text='Текст поста ' * 30, author=users[i % len(users)],
+            group=group if i % 2 else None, pub_date=timezone.now(),
+        )
+        for i in range(1, posts + 1)
+    ]
+    return {
+        'page_obj': Paginator(post_list, 10).get_page(1),
+        'title': 'Главная страница сайта Yatube',
+        'feed_key': 'render-benchmark',
+        'feed_timeout': 0,
+    }
+
+
+def measure(engine, context, renders):
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    timings = []
+    for _ in range(renders):
+        started = time.perf_counter()
+        engine.get_template('posts/index.html').render(
+            RequestContext(request, context)
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--renders', type=int, default=300)
+    parser.add_argument('--posts', type=int, default=10)
+    options = parser.parse_args()
+
+    dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    with override_settings(CACHES={'default': dummy, 'shared': dummy}):
+        context = index_context(options.posts)
+        results = {}
+        for name, cached in (('без кеша', False), ('кешируемый', True)):
+            engine = make_engine(cached)
+            started = time.perf_counter()
+            engine.get_template('posts/index.html')
+            compile_ms = (time.perf_counter() - started) * 1000
+            results[name] = measure(engine, context, options.renders)
+            print(
+                '{:<12} компиляция {:>7.2f} ms  p50 {p50_ms:>7.2f} ms  '
+                'p95 {p95_ms:>7.2f} ms  mean {mean_ms:>7.2f} ms'.format(
+                    name, compile_ms, **results[name]
+                )
+            )
+    speedup = results['без кеша']['p50_ms'] / results['кешируемый']['p50_ms']
+    print(f'Кешируемый загрузчик быстрее в {speedup:.1f} раза (p50)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Нагрузочный замер страниц приложения posts.
+
+Скрипт создаёт отдельную тестовую базу, наполняет её через mixer
+(как фикстуры в tests/) и для каждого сценария замеряет задержку
+(p50/p95), число SQL-запросов и пиковое выделение памяти на запрос.
+Результат сохраняется в JSON, два файла сравнивает compare.py:
+
+    python benchmarks/run.py --posts 5000 --requests 100
+    python benchmarks/compare.py benchmarks/results/old.json \\
+        benchmarks/results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext, setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse  # noqa: E402
+from mixer.backend.django import mixer  # noqa: E402
+
+from posts.models import Comment, Follow, Group, Post  # noqa: E402
+
+User = get_user_model()
+
+
+def seed(options):
+    """Набор данных заданного размера; картинок нет, как в фикстурах."""
+    users = mixer.cycle(options.users).blend(User)
+    groups = mixer.cycle(options.groups).blend(Group)
+    posts = [
+        mixer.blend(
+            Post,
+            author=random.choice(users),
+            group=random.choice(groups + [None]),
+            image=mixer.SKIP,
+        )
+        for _ in range(options.posts)
+    ]
+    for _ in range(options.comments):
+        mixer.blend(
+            Comment, post=random.choice(posts), author=random.choice(users)
+        )
+    pairs = set()
+    while len(pairs) < min(options.follows, len(users) * (len(users) - 1)):
+        user, author = random.sample(users, 2)
+        pairs.add((user, author))
+    for user, author in pairs:
+        Follow.objects.create(user=user, author=author)
+    return users, groups, [post.pk for post in posts]
+
+
+def scenarios(users, groups, post_ids):
+    """Имя сценария -> функция, возвращающая (метод, URL, данные)."""
+    def get(name, *args):
+        def scenario():
+            return 'get', reverse(name, args=[arg() for arg in args]), None
+        return scenario
+
+    def any_user():
+        return random.choice(users).username
+
+    def any_group():
+        return random.choice(groups).slug
+
+    def any_post():
+        return random.choice(post_ids)
+
+    return {
+        'index': get('posts:index'),
+        'group_list': get('posts:group_list', any_group),
+        'profile': get('posts:profile', any_user),
+        'post_detail': get('posts:post_detail', any_post),
+        'follow_index': get('posts:follow_index'),
+        'post_create': lambda: (
+            'post', reverse('posts:post_create'),
+            {'text': 'Пост из нагрузочного замера'},
+        ),
+        'add_comment': lambda: (
+            'post', reverse('posts:add_comment', args=[any_post()]),
+            {'text': 'Комментарий из нагрузочного замера'},
+        ),
+    }
+
+
+def request(client, scenario, cold):
+    if cold:
+        for alias in settings.CACHES:
+            caches[alias].clear()
+    method, url, data = scenario()
+    return getattr(client, method)(url, data)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def measure(client, scenario, options):
+    for _ in range(options.warmup):
+        request(client, scenario, options.cold)
+    timings = []
+    queries = []
+    statuses = set()
+    for _ in range(options.requests):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request(client, scenario, options.cold)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+    # Память замеряется отдельно: tracemalloc заметно замедляет запросы
+    peaks = []
+    for _ in range(options.alloc_requests):
+        tracemalloc.start()
+        request(client, scenario, options.cold)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': round(statistics.mean(queries), 2),
+        'max_queries': max(queries),
+        'peak_kib': round(max(peaks), 1) if peaks else None,
+        'statuses': sorted(statuses),
+    }
+
+
+def commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BASE_DIR, text=True, stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=2000)
+    parser.add_argument('--follows', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--alloc-requests', type=int, default=5)
+    parser.add_argument(
+        '--cold', action='store_true',
+        help='очищать кеши перед каждым запросом',
+    )
+    parser.add_argument(
+        '--only', nargs='+', metavar='SCENARIO',
+        help='замерить только эти сценарии',
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='путь к JSON с результатами')
+    return parser.parse_args()
+
+
+def main():
+    options = parse_args()
+    random.seed(options.seed)
+    setup_test_environment()
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        users, groups, post_ids = seed(options)
+        client = Client()
+        client.force_login(users[0])
+        results = {}
+        for name, scenario in scenarios(users, groups, post_ids).items():
+            if options.only and name not in options.only:
+                continue
+            results[name] = measure(client, scenario, options)
+            print(
+                '{:<14} p50 {p50_ms:>8.2f} ms  p95 {p95_ms:>8.2f} ms  '
+                'queries {queries:>6}  peak {peak_kib} KiB'.format(
+                    name, **results[name]
+                )
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        'commit': commit(),
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'dataset': {
+            name: getattr(options, name)
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        },
+        'requests': options.requests,
+        'cold': options.cold,
+        'results': results,
+    }
+    output = options.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        f'{report["commit"] or "local"}.json',
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as target:
+        json.dump(report, target, ensure_ascii=False, indent=2)
+    print(f'Результаты записаны в {output}')
+
+
+if __name__ == '__main__':
+    main()
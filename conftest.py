@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budget(settings):
+    """Как и в ``manage.py test``, запрос сверх ``@query_budget`` — ошибка."""
+    settings.QUERY_BUDGET_STRICT = True
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_teardown(item, nextitem):
+    """
+    Миниатюры, поставленные в очередь тестом, дописываются раньше, чем
+    фикстуры очистят базу и временный MEDIA_ROOT.
+    """
+    from core.testing import wait_thumbnails
+
+    wait_thumbnails()
@@ -0,0 +1,97 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.pagination import encode_cursor
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_pages(self):
+        url = reverse('api:posts')
+        page = self.get(url, limit=3)
+        ids = [row['id'] for row in page['results']]
+        page = self.get(url, limit=3, after=page['next_cursor'])
+        ids += [row['id'] for row in page['results']]
+        self.assertIsNone(page['next_cursor'])
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_bad_cursor(self):
+        """Курсор неверной формы — ответ 400, а не ошибка сервера."""
+        for values in ([[1], 1], [None, None], ['завтра', 'x']):
+            with self.subTest(values=values):
+                response = self.client.get(
+                    reverse('api:posts'), {'after': encode_cursor(values)}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_fields(self):
+        page = self.get(reverse('api:posts'), fields='id,author,group')
+        self.assertEqual(
+            page['results'][0],
+            {'id': self.posts[-1].pk, 'author': 'author', 'group': None},
+        )
+        response = self.client.get(reverse('api:posts'), {'fields': 'email'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_feeds(self):
+        urls = {
+            reverse('api:group_posts', args=[self.group.slug]): 2,
+            reverse('api:profile_posts', args=[self.author.username]): 5,
+            reverse('api:follow'): 5,
+        }
+        response = self.client.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.reader)
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(len(self.get(url)['results']), count)
+                self.assertQueryBudget(url)
+
+    def test_unknown_objects(self):
+        for url in (
+            reverse('api:group_posts', args=['nothing']),
+            reverse('api:profile_posts', args=['nobody']),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(reverse('api:posts'), {'after': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_gzip(self):
+        response = self.client.get(
+            reverse('api:posts'), {'limit': 100}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 5)
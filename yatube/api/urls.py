@@ -0,0 +1,19 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    # Лента всех постов
+    path('posts/', views.posts, name='posts'),
+    # Посты группы
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    # Посты автора
+    path(
+        'profile/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts'
+    ),
+    # Лента подписок
+    path('follow/', views.follow, name='follow'),
+]
@@ -0,0 +1,134 @@
+"""
+JSON-версия лент для мобильных клиентов.
+
+Строки читаются через ``values()`` — без создания моделей и без
+шаблонов. ``?fields=`` выбирает поля, ``?after=`` продолжает ленту с
+курсора из ``next_cursor``, ``?limit=`` задаёт размер страницы (не больше
+``MAX_LIMIT``). Ответы сжимаются gzip, если клиент его принимает.
+"""
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from core.profiling import query_budget
+from posts import resolver
+from posts.feeds import FOLLOW_ORDERING, follow_feed
+from posts.models import Post
+from posts.pagination import FEED_ORDERING, POSTS_PER_PAGE, CursorPaginator
+
+MAX_LIMIT = 100
+
+# Поле ответа -> путь для values()
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated_at': 'updated_at',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(detail, status=400):
+    return api_response({'detail': detail}, status=status)
+
+
+def api_view(budget):
+    """Бюджет запросов, только GET, gzip и ошибки параметров как 400."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except BadRequest as exc:
+                return error(str(exc))
+        return query_budget(budget)(gzip_page(require_GET(wrapper)))
+    return decorator
+
+
+def selected_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return list(POST_FIELDS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in POST_FIELDS]
+    if unknown or not names:
+        raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        raise BadRequest('Неверный limit')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def feed_response(request, queryset, ordering=FEED_ORDERING):
+    """Страница ленты ``queryset`` с выбранными полями."""
+    fields = selected_fields(request)
+    paths = {POST_FIELDS[name] for name in fields} | {
+        name.lstrip('-') for name in ordering
+    }
+    paginator = CursorPaginator(
+        queryset.values(*paths), page_size(request), ordering
+    )
+    after = request.GET.get('after')
+    if after and paginator._parse(after) is None:
+        raise BadRequest('Неверный курсор')
+    page = paginator.page(after=after)
+    results = [
+        {name: row[POST_FIELDS[name]] for name in fields}
+        for row in page.object_list
+    ]
+    if 'image' in fields:
+        for result in results:
+            image = result['image']
+            result['image'] = default_storage.url(image) if image else None
+    return api_response({'results': results, 'next_cursor': page.next_cursor})
+
+
+@api_view(3)
+def posts(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view(4)
+def group_posts(request, slug):
+    group = resolver.group(slug)
+    if group is None:
+        return error('Группа не найдена', status=404)
+    return feed_response(request, group.posts.all())
+
+
+@api_view(4)
+def profile_posts(request, username):
+    author = resolver.user(username)
+    if author is None:
+        return error('Пользователь не найден', status=404)
+    return feed_response(request, author.posts.all())
+
+
+@api_view(6)
+def follow(request):
+    if not request.user.is_authenticated:
+        return error('Требуется вход', status=401)
+    return feed_response(
+        request, follow_feed(request.user), FOLLOW_ORDERING
+    )
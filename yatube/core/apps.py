@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        if settings.TEMPLATE_WARMUP:
+            from .template_warmup import warm_up
+            warm_up()
@@ -0,0 +1,366 @@
+"""
+Кеш для нескольких процессов gunicorn.
+
+``RedisCache`` — общий для всех воркеров кеш по протоколу Redis.
+``TieredCache`` ставит перед общим кешем небольшой LRU в памяти процесса
+и защищает горячие ключи от «набегов» (cache stampede) вероятностным
+досрочным истечением: незадолго до конца жизни ключа отдельные запросы
+получают промах и пересчитывают значение, пока остальные читают старое.
+"""
+import math
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class RedisCache(BaseCache):
+    """
+    Кеш в Redis (или совместимом сервере).
+
+    ``OPTIONS['CLIENT_CLASS']`` — путь к классу клиента, который создаётся
+    по ``LOCATION`` через ``from_url``; по умолчанию ``redis.Redis``.
+    Для проверок без сервера подходит ``fakeredis.FakeRedis``.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._server = server
+        self._client_class = params.get('OPTIONS', {}).get(
+            'CLIENT_CLASS', 'redis.Redis'
+        )
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                client_class = import_string(self._client_class)
+            except ImportError as error:
+                raise ImproperlyConfigured(
+                    f'Для RedisCache нужен пакет клиента Redis: {error}'
+                )
+            self._client = client_class.from_url(self._server)
+        return self._client
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dump(self, value):
+        # Целые числа хранятся как есть, чтобы работал INCR
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, value):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return None
+        return max(int(math.ceil(timeout - time.time())), 0)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        if ttl == 0:
+            return False
+        return bool(self.client.set(
+            self._key(key, version), self._dump(value), ex=ttl, nx=True
+        ))
+
+    def get(self, key, default=None, version=None):
+        value = self.client.get(self._key(key, version))
+        return default if value is None else self._load(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl == 0:
+            self.client.delete(key)
+        else:
+            self.client.set(key, self._dump(value), ex=ttl)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is None:
+            return bool(self.client.persist(key))
+        return bool(self.client.expire(key, ttl))
+
+    def delete(self, key, version=None):
+        self.client.delete(self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self._key(key, version) for key in keys])
+        return {
+            key: self._load(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        with self.client.pipeline() as pipe:
+            for key, value in data.items():
+                pipe.set(self._key(key, version), self._dump(value), ex=ttl)
+            pipe.execute()
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self.client.exists(key):
+            raise ValueError(f"Key '{key}' not found")
+        return self.client.incrby(key, delta)
+
+    def clear(self):
+        self.client.flushdb()
+
+    def close(self, **kwargs):
+        # Пул соединений клиента переиспользуется между запросами
+        pass
+
+
+class _Envelope:
+    """Значение вместе с моментом истечения и временем его расчёта."""
+
+    __slots__ = ('value', 'expires', 'delta')
+
+    def __init__(self, value, expires, delta):
+        self.value = value
+        self.expires = expires
+        self.delta = delta
+
+    def __getstate__(self):
+        return self.value, self.expires, self.delta
+
+    def __setstate__(self, state):
+        self.value, self.expires, self.delta = state
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кеш: LRU в процессе перед общим кешем.
+
+    OPTIONS:
+      SHARED — псевдоним общего кеша из ``CACHES``;
+      LOCAL_MAX_ENTRIES — размер LRU процесса;
+      LOCAL_TIMEOUT — сколько секунд значение живёт в LRU (ограничивает
+        время, в течение которого другой воркер может видеть старое);
+      EARLY_EXPIRATION_BETA — агрессивность досрочного истечения,
+        0 отключает защиту от набегов.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1000))
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self._beta = float(options.get('EARLY_EXPIRATION_BETA', 1))
+        self._local = OrderedDict()
+        self._misses = {}
+        # Ключи, досрочно «истёкшие» в этом процессе: в общем кеше они ещё
+        # есть, поэтому add() после пересчёта должен их перезаписать
+        self._early = set()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _local_get(self, key):
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+        # Значения хранятся сериализованными, как в LocMemCache: изменение
+        # полученного объекта не должно менять закешированный
+        return item[0], pickle.loads(item[1])
+
+    def _local_set(self, key, value, expires=None):
+        local_expires = time.time() + self._local_timeout
+        if expires is not None:
+            local_expires = min(local_expires, expires)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (local_expires, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def _note_miss(self, key):
+        if len(self._misses) > self._local_max_entries:
+            self._misses.clear()
+        self._misses[key] = time.time()
+
+    def _expired_early(self, envelope):
+        """XFetch: промах вероятнее у близкого к истечению и долгого ключа."""
+        if not self._beta or not envelope.delta:
+            return False
+        gap = -envelope.delta * self._beta * math.log(1 - random.random())
+        return time.time() + gap >= envelope.expires
+
+    def _wrap(self, key, value, timeout):
+        started = self._misses.pop(key, None)
+        expires = self.get_backend_timeout(timeout)
+        if started is None or expires is None:
+            return value, expires
+        return _Envelope(value, expires, time.time() - started), expires
+
+    def _unwrap(self, key, stored, default):
+        if isinstance(stored, _Envelope):
+            if self._expired_early(stored):
+                self._note_miss(key)
+                if len(self._early) > self._local_max_entries:
+                    self._early.clear()
+                self._early.add(key)
+                return default, None
+            return stored.value, stored.expires
+        return stored, None
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        item = self._local_get(key)
+        if item is not None:
+            return item[1]
+        stored = self.shared.get(key, _MISSING, version=0)
+        if stored is _MISSING:
+            self._note_miss(key)
+            return default
+        value, expires = self._unwrap(key, stored, _MISSING)
+        if value is _MISSING:
+            return default
+        self._local_set(key, value, expires)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = {}
+        for key in keys:
+            full_key = self._key(key, version)
+            item = self._local_get(full_key)
+            if item is not None:
+                found[key] = item[1]
+            else:
+                missing[full_key] = key
+        if missing:
+            stored = self.shared.get_many(list(missing), version=0)
+            for full_key, key in missing.items():
+                if full_key not in stored:
+                    self._note_miss(full_key)
+                    continue
+                value, expires = self._unwrap(
+                    full_key, stored[full_key], _MISSING
+                )
+                if value is not _MISSING:
+                    found[key] = value
+                    self._local_set(full_key, value, expires)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        stored, expires = self._wrap(key, value, timeout)
+        self.shared.set(key, stored, self._remaining(expires), version=0)
+        self._local_set(key, value, expires)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        stored, expires = self._wrap(key, value, timeout)
+        if key in self._early:
+            # get_or_set после досрочного промаха: старое значение ещё
+            # лежит в общем кеше, и add() выбросил бы пересчитанное
+            self._early.discard(key)
+            self.shared.set(key, stored, self._remaining(expires), version=0)
+            added = True
+        else:
+            added = self.shared.add(
+                key, stored, self._remaining(expires), version=0
+            )
+        if added:
+            self._local_set(key, value, expires)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._local_delete(key)
+        return self.shared.touch(key, timeout, version=0)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._local_delete(key)
+        self.shared.delete(key, version=0)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        self._local_delete(*keys)
+        self.shared.delete_many(keys, version=0)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        if self._local_get(key) is not None:
+            return True
+        return self.shared.has_key(key, version=0)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        self._local_delete(key)
+        return self.shared.incr(key, delta, version=0)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._misses.clear()
+            self._early.clear()
+        self.shared.clear()
+
+    def _remaining(self, expires):
+        if expires is None:
+            return None
+        return max(expires - time.time(), 0)
+
+
+_MISSING = object()
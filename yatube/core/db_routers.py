@@ -0,0 +1,68 @@
+"""
+Чтение с реплик, запись в основную базу.
+
+Запросы на чтение расходятся по ``DATABASE_REPLICAS``, запись и всё, что
+выполняется внутри транзакции, идёт в ``default``. Чтобы пользователь
+сразу видел то, что сам записал (например, свой пост после редиректа
+из post_create в profile), после записи поток «прилипает» к основной
+базе до конца запроса, а ``ReplicaPinMiddleware`` продлевает это на
+``REPLICA_PIN_SECONDS`` следующих запросов через cookie.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def was_written():
+    return getattr(_state, 'written', False)
+
+
+def pin(written=False):
+    """Направляет чтение текущего потока в основную базу."""
+    _state.pinned = True
+    _state.written = was_written() or written
+
+
+def reset():
+    _state.pinned = False
+    _state.written = False
+
+
+@contextmanager
+def use_primary():
+    """Читать из основной базы внутри блока."""
+    pinned = is_pinned()
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = pinned
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or is_pinned()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin(written=True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
@@ -0,0 +1,93 @@
+import logging
+
+from django.conf import settings
+
+from . import db_routers, profiling
+
+logger = logging.getLogger('core.profiler')
+
+PIN_COOKIE = 'use_primary'
+
+
+class ReplicaPinMiddleware:
+    """
+    Читать из основной базы в течение ``REPLICA_PIN_SECONDS`` после записи.
+
+    Без этого пост, созданный в post_create, мог бы ещё не доехать до
+    реплики, с которой читает profile после редиректа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_routers.reset()
+        if request.COOKIES.get(PIN_COOKIE):
+            db_routers.pin()
+        try:
+            response = self.get_response(request)
+            if db_routers.was_written():
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+        finally:
+            db_routers.reset()
+        return response
+
+
+class SQLProfilerMiddleware:
+    """
+    Число и время SQL-запросов, время шаблонов и самый медленный запрос.
+
+    Данные пишутся в лог ``core.profiler`` (в ``extra['profile']``), при
+    ``SQL_PROFILER_HEADERS`` — ещё и в заголовки ``Server-Timing`` и
+    ``X-SQL-Queries``. Превышение бюджета из ``@query_budget`` логируется
+    как предупреждение, а при ``QUERY_BUDGET_STRICT`` ещё и завершает
+    запрос исключением ``QueryBudgetExceeded``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profiling.profile() as result:
+            response = self.get_response(request)
+        budget = getattr(request, 'query_budget', None)
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': result.queries,
+            'query_budget': budget,
+            'sql_ms': round(result.sql_time * 1000, 2),
+            'template_ms': round(result.template_time * 1000, 2),
+            'total_ms': round(result.total_time * 1000, 2),
+            'slowest_sql_ms': round(result.slowest_time * 1000, 2),
+            'slowest_sql': result.slowest_sql,
+        }
+        over_budget = budget is not None and result.queries > budget
+        logger.log(
+            logging.WARNING if over_budget else logging.DEBUG,
+            '%(method)s %(path)s %(status)s: %(queries)s SQL '
+            'за %(sql_ms)s мс, шаблоны %(template_ms)s мс, '
+            'всего %(total_ms)s мс',
+            data, extra={'profile': data},
+        )
+        if settings.SQL_PROFILER_HEADERS:
+            response['Server-Timing'] = ', '.join([
+                f'sql;dur={data["sql_ms"]};desc="{result.queries} queries"',
+                f'template;dur={data["template_ms"]}',
+                f'total;dur={data["total_ms"]}',
+            ])
+            response['X-SQL-Queries'] = str(result.queries)
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise profiling.QueryBudgetExceeded(
+                f'{request.method} {request.path}: {result.queries} SQL '
+                f'при бюджете {budget}'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
@@ -0,0 +1,110 @@
+"""
+Профиль запроса: SQL-запросы, их время и время отрисовки шаблонов.
+
+SQL перехватывается через ``connection.execute_wrapper`` и работает без
+``DEBUG``. Для шаблонов ``Template.render`` оборачивается один раз при
+первом использовании — так же, как это делает тестовое окружение
+Django; вложенные шаблоны ({% include %}) не считаются повторно.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.db import connections
+from django.template import base
+
+_local = threading.local()
+_instrumented = False
+_instrument_lock = threading.Lock()
+
+
+class Profile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.slowest_sql = None
+        self.slowest_time = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def record_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += duration
+            if duration >= self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+
+
+def current():
+    """Профиль текущего запроса или None."""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profile():
+    """Записывает SQL и отрисовку шаблонов внутри блока."""
+    instrument_templates()
+    result = Profile()
+    previous = current()
+    _local.profile = result
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(result.record_sql)
+                )
+            yield result
+    finally:
+        _local.profile = previous
+
+
+def instrument_templates():
+    global _instrumented
+    with _instrument_lock:
+        if _instrumented:
+            return
+        render = base.Template.render
+
+        @wraps(render)
+        def timed_render(self, context):
+            result = current()
+            if result is None or getattr(_local, 'rendering', False):
+                return render(self, context)
+            _local.rendering = True
+            started = time.perf_counter()
+            try:
+                return render(self, context)
+            finally:
+                result.template_time += time.perf_counter() - started
+                _local.rendering = False
+
+        base.Template.render = timed_render
+        _instrumented = True
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    """
+    Объявляет, сколько SQL-запросов может выполнить представление.
+
+    Превышение пишется в лог профилировщиком, а при
+    ``QUERY_BUDGET_STRICT`` (включается тестовым раннером) запрос падает
+    с ``QueryBudgetExceeded``.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
@@ -0,0 +1,47 @@
+"""
+Прогрев кешируемого загрузчика шаблонов.
+
+Все шаблоны из каталогов движка компилируются при старте процесса, и
+первые запросы после деплоя не тратят время на их разбор.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    dirs = list(engine.dirs)
+    if engine.app_dirs or any(
+        'app_directories' in str(loader) for loader in engine.loaders
+    ):
+        dirs += get_app_template_dirs('templates')
+    for root in dirs:
+        for path, _, files in os.walk(root):
+            for name in files:
+                if name.endswith(('.html', '.txt')):
+                    yield os.path.relpath(
+                        os.path.join(path, name), root
+                    ).replace(os.sep, '/')
+
+
+def warm_up():
+    """Компилирует шаблоны всех движков Django; возвращает их число."""
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in sorted(set(template_names(engine))):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                # Шаблоны сторонних приложений могут требовать библиотеки
+                # тегов, которых нет в проекте
+                logger.warning('Шаблон %s не скомпилирован: %s', name, error)
+                continue
+            compiled += 1
+    return compiled
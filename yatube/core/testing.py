@@ -0,0 +1,60 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """
+    Раннер, с которым любой запрос сверх ``@query_budget`` валит тест.
+
+    Так бюджет проверяется на всех путях, которые проходят тесты, включая
+    холодные кеши, а не только в ``assertQueryBudget``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+
+
+class QueryBudgetMixin:
+    """
+    Проверка бюджета SQL-запросов, объявленного через ``@query_budget``.
+
+    Бюджет считается на весь запрос, включая сессию и пользователя.
+    """
+
+    def assertQueryBudget(self, url, method='get', data=None, client=None):
+        view = resolve(urlsplit(url).path).func
+        budget = getattr(view, 'query_budget', None)
+        self.assertIsNotNone(
+            budget, f'У представления {view.__name__} не задан query_budget'
+        )
+        client = client or self.client
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url, data)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url}: {len(queries)} SQL при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries),
+        )
+        return response
+
+
+def wait_thumbnails():
+    """
+    Дожидается миниатюр из пула ``posts.thumbnails``.
+
+    Пул закрывается после выполнения очереди, следующая задача создаст
+    новый: фоновые потоки не пишут в MEDIA_ROOT и базу, которые тест уже
+    убирает.
+    """
+    from posts import thumbnails
+
+    with thumbnails._lock:
+        executor, thumbnails._executor = thumbnails._executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
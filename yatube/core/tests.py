@@ -1,4 +1,26 @@
-from django.test import TestCase, Client
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+
+from posts import views
+
+from . import db_routers
+from .cache_backends import RedisCache, TieredCache
+from .middleware import PIN_COOKIE, ReplicaPinMiddleware
+from .profiling import QueryBudgetExceeded
+from .template_warmup import warm_up
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
 
 
 def setUp(self) -> None:
@@ -10,3 +32,189 @@ class ViewTestClass(TestCase):
         response = self.guest_client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html',)
+
+
+class TieredCacheTest(TestCase):
+    def setUp(self):
+        self.cache = TieredCache('', {'OPTIONS': {'SHARED': 'shared'}})
+        self.cache.clear()
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение обслуживается LRU процесса."""
+        self.cache.set('key', 'value')
+        caches['shared'].clear()
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_delete_and_incr_reach_shared_tier(self):
+        self.cache.set('key', 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+        self.cache.set('counter', 1, None)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+
+    def test_local_tier_is_bounded(self):
+        cache = TieredCache('', {'OPTIONS': {'LOCAL_MAX_ENTRIES': 2}})
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertEqual(len(cache._local), 2)
+
+    def test_early_expiration(self):
+        """Долго считавшийся ключ досрочно «истекает» перед концом жизни."""
+        self.assertIsNone(self.cache.get('hot'))
+        self.cache.set('hot', 'page', timeout=60)
+        stored = caches['shared'].get(self.cache._key('hot'), version=0)
+        stored.delta = 3600
+        caches['shared'].set(self.cache._key('hot'), stored, 60, version=0)
+        self.cache._local.clear()
+        self.assertIsNone(self.cache.get('hot'))
+
+        self.cache.set('cold', 'page', timeout=60)
+        self.cache._local.clear()
+        self.assertEqual(self.cache.get('cold'), 'page')
+
+    def test_early_expiration_get_or_set(self):
+        """Пересчитанное после досрочного промаха значение сохраняется."""
+        self.cache.get('count')
+        self.cache.set('count', 1, timeout=60)
+        stored = caches['shared'].get(self.cache._key('count'), version=0)
+        # Такой долгий расчёт «истекает» досрочно практически наверняка
+        stored.delta = 10 ** 9
+        caches['shared'].set(self.cache._key('count'), stored, 60, version=0)
+        self.cache._local.clear()
+        self.assertEqual(self.cache.get_or_set('count', 2, timeout=60), 2)
+        self.cache._local.clear()
+        stored = caches['shared'].get(self.cache._key('count'), version=0)
+        self.assertEqual(stored.value, 2)
+        # Обычный add() существующий ключ по-прежнему не трогает
+        self.assertFalse(self.cache.add('count', 3))
+
+
+@skipUnless(fakeredis, 'нужен пакет fakeredis')
+class RedisCacheTest(TestCase):
+    def setUp(self):
+        self.cache = RedisCache('redis://localhost/0', {
+            'OPTIONS': {'CLIENT_CLASS': 'fakeredis.FakeRedis'},
+        })
+        self.cache.clear()
+
+    def test_round_trip(self):
+        self.cache.set('key', {'title': 'Пост'})
+        self.cache.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(self.cache.get('key'), {'title': 'Пост'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': [2]}
+        )
+        self.assertFalse(self.cache.add('a', 5))
+        self.assertEqual(self.cache.incr('a', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete_many(['a', 'b'])
+        self.assertFalse(self.cache.has_key('a'))
+
+    def test_timeout(self):
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'value', timeout=None)
+        self.assertEqual(self.cache.client.ttl(self.cache._key('key')), -1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        db_routers.reset()
+        self.addCleanup(db_routers.reset)
+        self.router = db_routers.PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica_until_write(self):
+        """После записи поток читает из основной базы."""
+        self.assertEqual(self.router.db_for_read(None), 'replica1')
+        self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_transaction_reads_primary(self):
+        with mock.patch.object(
+            connections['default'], 'in_atomic_block', True
+        ):
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_use_primary(self):
+        with db_routers.use_primary():
+            self.assertEqual(self.router.db_for_read(None), 'default')
+        self.assertEqual(self.router.db_for_read(None), 'replica1')
+
+    def test_middleware_keeps_writer_on_primary(self):
+        """Запись ставит cookie, и следующий запрос читает из default."""
+        reads = []
+
+        def write_view(request):
+            self.router.db_for_write(None)
+            return HttpResponse()
+
+        def read_view(request):
+            reads.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        factory = RequestFactory()
+        response = ReplicaPinMiddleware(write_view)(factory.post('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        ReplicaPinMiddleware(read_view)(factory.get('/'))
+        factory.cookies[PIN_COOKIE] = '1'
+        ReplicaPinMiddleware(read_view)(factory.get('/'))
+        self.assertEqual(reads, ['replica1', 'default'])
+
+
+class SQLProfilerTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_server_timing_headers(self):
+        """Ответ несёт число SQL-запросов и Server-Timing."""
+        with self.settings(SQL_PROFILER_HEADERS=True):
+            response = self.client.get('/')
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('template;dur=', response['Server-Timing'])
+        self.assertGreater(int(response['X-SQL-Queries']), 0)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_over_budget_is_logged(self):
+        """Превышение бюджета запросов пишется в лог предупреждением."""
+        with mock.patch.object(
+            views.index, 'query_budget', 0
+        ), self.assertLogs('core.profiler', 'WARNING') as logs:
+            self.client.get('/')
+        self.assertEqual(logs.records[0].profile['path'], '/')
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_over_budget_fails_in_tests(self):
+        """Под тестовым раннером превышение бюджета — исключение."""
+        with mock.patch.object(
+            views.index, 'query_budget', 0
+        ), self.assertLogs('core.profiler', 'WARNING'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/')
+
+
+class TemplateWarmupTest(SimpleTestCase):
+    @override_settings(TEMPLATES=[{
+        **settings.TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **settings.TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    }])
+    def test_templates_compiled(self):
+        """Прогрев кладёт шаблоны проекта в кеш загрузчика."""
+        self.assertGreater(warm_up(), 0)
+        loader = engines['django'].engine.template_loaders[0]
+        for name in ('base.html', 'posts/index.html', 'includes/post.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, loader.get_template_cache)
@@ -1,15 +1,22 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import get_backend
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_display = ('pk', 'text', 'pub_date', 'updated_at', 'author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу вместо LIKE по всей таблице
+        if not search_term:
+            return queryset, False
+        return get_backend().search(search_term, queryset), False
+
 
 admin.site.register(Post, PostAdmin)
 
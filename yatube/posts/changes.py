@@ -0,0 +1,76 @@
+"""
+Журнал изменений постов.
+
+Сигналы пишут PostChange при каждом сохранении и удалении поста в той же
+транзакции, что и сам пост. Кеши, поисковый индекс и материализованные
+ленты читают журнал с запомненного курсора (id последней записи) вместо
+повторного просмотра всей таблицы постов.
+
+Id выдаются при вставке, а видны записи после фиксации, поэтому запись
+с меньшим id может появиться позже записи с большим и осталась бы позади
+курсора. ``since`` отдаёт только записи старше ``CHANGES_SAFETY_LAG``
+секунд и останавливается на первой более свежей: транзакции с постами
+короче этого запаса.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Post, PostChange
+
+CHANGES_PER_PAGE = 500
+MAX_CHANGES_PER_PAGE = 5000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def record(post_id, kind):
+    PostChange.objects.create(post_id=post_id, kind=kind)
+
+
+def since(after=None, limit=CHANGES_PER_PAGE):
+    """
+    Изменения после курсора ``after`` и курсор для следующего вызова.
+
+    Если изменений нет, возвращается тот же курсор: потребитель просто
+    повторяет запрос позже. Записи моложе ``CHANGES_SAFETY_LAG`` придут
+    в одном из следующих вызовов.
+    """
+    try:
+        after = int(after) if after else 0
+    except ValueError:
+        raise InvalidCursor(after)
+    changes = list(
+        PostChange.objects.filter(pk__gt=after)
+        .order_by('pk')
+        .values('pk', 'post_id', 'kind', 'changed_at')[:limit]
+    )
+    settled = timezone.now() - timedelta(seconds=settings.CHANGES_SAFETY_LAG)
+    for index, change in enumerate(changes):
+        if change['changed_at'] > settled:
+            del changes[index:]
+            break
+    for change in changes:
+        change['cursor'] = str(change.pop('pk'))
+    next_cursor = changes[-1]['cursor'] if changes else str(after)
+    return changes, next_cursor
+
+
+def backfill():
+    """Записи о создании для постов без записей: bulk_create их не пишет."""
+    missing = (
+        Post.objects.order_by()
+        .annotate(logged=Exists(
+            PostChange.objects.filter(post_id=OuterRef('pk'))
+        ))
+        .filter(logged=False)
+        .values_list('pk', flat=True)
+    )
+    PostChange.objects.bulk_create(
+        PostChange(post_id=pk, kind=PostChange.CREATED)
+        for pk in missing.iterator()
+    )
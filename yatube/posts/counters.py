@@ -0,0 +1,99 @@
+"""
+Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами атомарными UPDATE ... SET n = n + 1, поэтому
+страницы профиля, группы и поста не выполняют COUNT(*). Строка AuthorStats
+создаётся вместе с пользователем; пересчёт на месте остался только для
+случайно пропавшей строки при увеличении счётчика, а все счётчики целиком
+пересчитывает команда ``manage.py rebuild_counters``.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def _shift(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def create_author(user_id):
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=user_id)], ignore_conflicts=True
+    )
+
+
+def change_author(user_id, field, delta):
+    stats = AuthorStats.objects.filter(pk=user_id)
+    # Уменьшать пропавшую строку незачем: при удалении пользователя каскад
+    # стирает её раньше его постов и подписок, и пересчёт вернул бы строку
+    # пользователю, который вот-вот исчезнет
+    if not _shift(stats, field, delta) and delta > 0:
+        rebuild_author(user_id)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def rebuild_author(user_id):
+    if not User.objects.filter(pk=user_id).exists():
+        return None
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+            'following_count': Follow.objects.filter(user_id=user_id).count(),
+        },
+    )
+    return stats
+
+
+def author_stats(user):
+    """Счётчики пользователя; создаёт строку, если её ещё нет."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return rebuild_author(user.pk)
+
+
+def _count(model, field):
+    subquery = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+@transaction.atomic
+def rebuild_all(batch_size=1000):
+    """Пересчитывает все счётчики несколькими UPDATE с подзапросами."""
+    AuthorStats.objects.all().delete()
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(user_id=pk)
+            for pk in User.objects.values_list('pk', flat=True).iterator()
+        ),
+        batch_size=batch_size,
+    )
+    AuthorStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
@@ -0,0 +1,65 @@
+"""
+Потоковая выгрузка постов, комментариев и подписок в ndjson.
+
+Строки читаются через ``iterator(chunk_size=...)`` и сразу отдаются,
+поэтому память не зависит от размера таблицы. Каждая строка содержит
+``cursor``: выгрузку можно продолжить с места обрыва, передав курсор
+последней полученной строки.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+from .pagination import CursorPaginator
+
+CHUNK_SIZE = 2000
+
+EXPORTS = {
+    'posts': (
+        Post, ('pub_date', 'id'),
+        (
+            'id', 'text', 'pub_date', 'updated_at', 'author_id', 'group_id',
+            'image',
+        ),
+    ),
+    'comments': (
+        Comment, ('created', 'id'),
+        ('id', 'post_id', 'author_id', 'text', 'created'),
+    ),
+    'follows': (
+        Follow, ('id',),
+        ('id', 'user_id', 'author_id'),
+    ),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def rows(kind, after=None, chunk_size=CHUNK_SIZE):
+    """
+    Строки таблицы ``kind`` по порядку курсора, начиная после ``after``.
+
+    Неверный курсор отвергается сразу, до начала выгрузки.
+    """
+    model, ordering, fields = EXPORTS[kind]
+    queryset = model.objects.order_by(*ordering)
+    paginator = CursorPaginator(queryset, chunk_size, ordering)
+    if after:
+        values = paginator._parse(after)
+        if values is None:
+            raise InvalidCursor(after)
+        queryset = queryset.filter(paginator._seek(values, False))
+    iterator = queryset.values(*fields).iterator(chunk_size=chunk_size)
+    return (
+        dict(row, cursor=paginator.get_cursor(row)) for row in iterator
+    )
+
+
+def ndjson(kind, after=None, chunk_size=CHUNK_SIZE):
+    return (
+        json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        for row in rows(kind, after, chunk_size)
+    )
@@ -0,0 +1,168 @@
+"""
+Кеширование лент с версионными ключами.
+
+Ключ фрагмента ленты содержит версии её «областей» (все посты, группа,
+автор). Сигналы увеличивают версию при изменении постов и групп, поэтому
+старые фрагменты просто перестают читаться и новый пост виден сразу,
+а неизменившиеся ленты живут в кеше до ``FEED_CACHE_TIMEOUT``.
+
+Версия — время последнего изменения области в миллисекундах, поэтому из
+тех же версий без запросов к базе строятся ETag и Last-Modified страниц
+(``conditional``). Кеш под новой версией заполняется из основной базы:
+реплика могла ещё не получить изменение, и устаревшие данные прожили бы
+в кеше до ``FEED_CACHE_TIMEOUT``.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection, transaction
+from django.views.decorators.http import condition
+
+from core.db_routers import pin, use_primary
+
+VERSION_PREFIX = 'feed-version'
+
+ALL_POSTS = 'posts'
+ALL_GROUPS = 'groups'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    """Комментарии поста."""
+    return f'post:{post_id}'
+
+
+def follows_scope(user_id):
+    """Подписчики и подписки пользователя."""
+    return f'follows:{user_id}'
+
+
+def _version_key(scope):
+    return f'{VERSION_PREFIX}:{scope}'
+
+
+def _now():
+    # Вытесненная из кеша версия начинается с текущего времени, а не
+    # с единицы, иначе снова стали бы читаться устаревшие фрагменты
+    return int(time.time() * 1000)
+
+
+def _version_cache():
+    return caches[settings.FEED_VERSION_CACHE]
+
+
+def versions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = _version_cache().get_many(keys)
+    missing = {key: _now() for key in keys if key not in found}
+    if missing:
+        _version_cache().set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def feed_version(*scopes):
+    """
+    Ключ фрагмента ленты по версиям ``scopes``.
+
+    Пока самая новая из версий моложе ``REPLICA_PIN_SECONDS``, запрос
+    читает из основной базы: фрагмент заполняется при отрисовке.
+    """
+    found = versions(*scopes)
+    if _now() - max(found) < settings.REPLICA_PIN_SECONDS * 1000:
+        pin()
+    return ';'.join(
+        f'{scope}@{value}' for scope, value in zip(scopes, found)
+    )
+
+
+def bump(*scopes):
+    """
+    Новые версии областей ``scopes``.
+
+    Внутри транзакции версии увеличиваются ещё раз после фиксации:
+    параллельный запрос мог успеть закешировать под промежуточной версией
+    данные, прочитанные до неё.
+    """
+    _bump(scopes)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    now = _now()
+    keys = [_version_key(scope) for scope in set(scopes)]
+    found = _version_cache().get_many(keys)
+    for key in keys:
+        # incr сохраняет атомарность: одновременные изменения не
+        # получат одну и ту же версию, даже если часы совпали
+        try:
+            _version_cache().incr(key, max(now - found.get(key, now), 1))
+        except ValueError:
+            _version_cache().set(key, now, None)
+
+
+def conditional(scopes, modified=None):
+    """
+    Условный GET для страницы, зависящей от областей ``scopes``.
+
+    ``scopes(request, *args, **kwargs)`` возвращает список областей или
+    None, если объекта нет (тогда представление само ответит 404). ETag
+    учитывает пользователя: шапка и кнопки на страницах у всех разные.
+    ``modified`` с теми же аргументами может вернуть время правки самого
+    объекта: Last-Modified не бывает раньше него.
+    """
+    def get_versions(request, *args, **kwargs):
+        if not hasattr(request, '_feed_versions'):
+            found = scopes(request, *args, **kwargs)
+            request._feed_versions = (
+                None if found is None else dict(zip(found, versions(*found)))
+            )
+        return request._feed_versions
+
+    def etag(request, *args, **kwargs):
+        found = get_versions(request, *args, **kwargs)
+        if found is None:
+            return None
+        state = ';'.join(f'{scope}@{value}' for scope, value in found.items())
+        return f'{request.user.pk or 0}:{state}'
+
+    def last_modified(request, *args, **kwargs):
+        found = get_versions(request, *args, **kwargs)
+        if not found:
+            return None
+        latest = datetime.fromtimestamp(
+            max(found.values()) / 1000, tz=timezone.utc
+        )
+        changed = modified and modified(request, *args, **kwargs)
+        return max(latest, changed) if changed else latest
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def cached_count(queryset, version):
+    """COUNT(*) ленты, пересчитываемый только при смене версии."""
+    def count():
+        with use_primary():
+            return queryset.count()
+
+    return cache.get_or_set(
+        f'feed-count:{version}', count, settings.FEED_CACHE_TIMEOUT
+    )
+
+
+def feed_context(request, version):
+    """Ключ и время жизни фрагмента ленты для тега {% cache %}."""
+    return {
+        'feed_key': f'{version}:{request.GET.urlencode()}',
+        'feed_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
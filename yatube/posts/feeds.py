@@ -0,0 +1,274 @@
+"""
+Материализованная лента подписок (fan-out-on-write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, поэтому
+``follow_index`` читает готовый список вместо соединения Follow и Post.
+Авторы, у которых подписчиков больше ``FEED_FANOUT_LIMIT``, в ленты
+не раскладываются: их посты подмешиваются при чтении (fan-out-on-read),
+чтобы одна публикация не порождала неограниченное число записей. Когда
+подписчиков снова становится не больше предела, последние посты автора
+раскладываются по лентам заново.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from . import follow_state
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+# Сортировка ленты подписок по аннотациям ``follow_feed``
+FOLLOW_ORDERING = ('-feed_date', '-feed_post')
+
+
+def fanout_limit():
+    return settings.FEED_FANOUT_LIMIT
+
+
+def timeline_length():
+    return settings.FEED_TIMELINE_LENGTH
+
+
+def celebrity_ids(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    followed = follow_state.followed_ids(user)
+    if not followed:
+        return []
+    return list(
+        AuthorStats.objects.filter(
+            pk__in=followed, followers_count__gt=fanout_limit(),
+        ).values_list('pk', flat=True)
+    )
+
+
+# Новый пост в ленты всех подписчиков автора, если автор не популярный
+FAN_OUT_SQL = """
+    {insert} {entries} (user_id, post_id, pub_date)
+    SELECT user_id, %s, %s FROM {follows}
+    WHERE author_id = %s AND NOT EXISTS (
+        SELECT 1 FROM {stats} WHERE user_id = %s AND followers_count > %s
+    )
+    {ignore_conflicts}
+"""
+
+
+def _insert_sql(template):
+    ops = connection.ops
+    quote = ops.quote_name
+    return template.format(
+        insert=ops.insert_statement(ignore_conflicts=True),
+        entries=quote(TimelineEntry._meta.db_table),
+        follows=quote(Follow._meta.db_table),
+        posts=quote(Post._meta.db_table),
+        stats=quote(AuthorStats._meta.db_table),
+        ignore_conflicts=ops.ignore_conflicts_suffix_sql(
+            ignore_conflicts=True
+        ),
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает пост по лентам подписчиков одним INSERT … SELECT."""
+    pub_date = connection.ops.adapt_datetimefield_value(post.pub_date)
+    with connection.cursor() as cursor:
+        cursor.execute(_insert_sql(FAN_OUT_SQL), [
+            post.pk, pub_date, post.author_id, post.author_id, fanout_limit(),
+        ])
+        added = cursor.rowcount
+    if added:
+        trim_followers(post.author_id)
+
+
+# Последние посты автора в ленту нового подписчика; у популярного автора
+# (подписчиков больше FEED_FANOUT_LIMIT) посты читаются напрямую
+BACKFILL_SQL = """
+    {insert} {entries} (user_id, post_id, pub_date)
+    SELECT %s, id, pub_date FROM {posts}
+    WHERE author_id = %s AND NOT EXISTS (
+        SELECT 1 FROM {stats} WHERE user_id = %s AND followers_count > %s
+    )
+    ORDER BY pub_date DESC, id DESC
+    LIMIT %s
+    {ignore_conflicts}
+"""
+
+
+def backfill(user_id, author_id):
+    """
+    Добавляет в ленту последние посты автора после подписки.
+
+    Один INSERT … SELECT вместо чтения постов и отдельной вставки; лента
+    обрезается, только если в неё что-то добавилось.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_insert_sql(BACKFILL_SQL), [
+            user_id, author_id, author_id, fanout_limit(), timeline_length(),
+        ])
+        added = cursor.rowcount
+    if added:
+        trim(user_id)
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+# Последние посты автора в ленты всех его подписчиков — только если после
+# отписки подписчиков осталось ровно FEED_FANOUT_LIMIT, то есть автор
+# только что перестал быть популярным. Посты, вышедшие, пока он им был,
+# в ленты не раскладывались, а при чтении больше не подмешиваются
+REFILL_SQL = """
+    {insert} {entries} (user_id, post_id, pub_date)
+    SELECT follow.user_id, post.id, post.pub_date
+    FROM {follows} follow, (
+        SELECT id, pub_date FROM {posts} WHERE author_id = %s
+        ORDER BY pub_date DESC, id DESC
+        LIMIT %s
+    ) post
+    WHERE follow.author_id = %s AND EXISTS (
+        SELECT 1 FROM {stats} WHERE user_id = %s AND followers_count = %s
+    )
+    {ignore_conflicts}
+"""
+
+
+def refill_author(author_id):
+    """Раскладывает посты автора, опустившегося до FEED_FANOUT_LIMIT."""
+    with connection.cursor() as cursor:
+        cursor.execute(_insert_sql(REFILL_SQL), [
+            author_id, timeline_length(), author_id, author_id,
+            fanout_limit(),
+        ])
+        added = cursor.rowcount
+    if added:
+        users = Follow.objects.filter(author_id=author_id).order_by()
+        _trim(*users.values('user_id').query.sql_with_params())
+
+
+# Лишние записи переполненных лент: всё, что дальше
+# FEED_TIMELINE_LENGTH свежих постов. Ленты короче предела отсекаются
+# по индексу (user, post) ещё до сортировки
+TRIM_SQL = """
+    DELETE FROM {entries} WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC
+            ) AS position
+            FROM {entries}
+            WHERE user_id IN (
+                SELECT user_id FROM {entries}
+                WHERE user_id IN ({users})
+                GROUP BY user_id
+                HAVING COUNT(*) > %s
+            )
+        ) ranked
+        WHERE position > %s
+    )
+"""
+
+
+def _trim(users, params):
+    sql = TRIM_SQL.format(
+        entries=connection.ops.quote_name(TimelineEntry._meta.db_table),
+        users=users,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, timeline_length(), timeline_length()])
+
+
+def trim(user_id):
+    """Оставляет в ленте только ``FEED_TIMELINE_LENGTH`` свежих постов."""
+    _trim('%s', [user_id])
+
+
+# После публикации лента каждого подписчика выросла не больше чем на одну
+# запись: лишней может быть только запись на позиции FEED_TIMELINE_LENGTH.
+# Её ищет короткий проход по индексу (user, -pub_date, -post) — без
+# подсчёта всех записей всех лент
+TRIM_FOLLOWERS_SQL = """
+    DELETE FROM {entries} WHERE id IN (
+        SELECT (
+            SELECT entry.id FROM {entries} entry
+            WHERE entry.user_id = follow.user_id
+            ORDER BY entry.pub_date DESC, entry.post_id DESC
+            LIMIT 1 OFFSET %s
+        )
+        FROM {follows} follow
+        WHERE follow.author_id = %s
+    )
+"""
+
+
+def trim_followers(author_id):
+    """``trim`` для лент подписчиков автора после одного нового поста."""
+    quote = connection.ops.quote_name
+    sql = TRIM_FOLLOWERS_SQL.format(
+        entries=quote(TimelineEntry._meta.db_table),
+        follows=quote(Follow._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [timeline_length(), author_id])
+
+
+# Последние FEED_TIMELINE_LENGTH постов авторов из подписок каждого
+# пользователя, кроме популярных авторов
+FILL_SQL = """
+    INSERT INTO {entries} (user_id, post_id, pub_date)
+    SELECT user_id, post_id, pub_date FROM (
+        SELECT follow.user_id AS user_id, post.id AS post_id,
+            post.pub_date AS pub_date, ROW_NUMBER() OVER (
+                PARTITION BY follow.user_id
+                ORDER BY post.pub_date DESC, post.id DESC
+            ) AS position
+        FROM {follows} follow
+        JOIN {posts} post ON post.author_id = follow.author_id
+        WHERE follow.author_id NOT IN (
+            SELECT user_id FROM {stats} WHERE followers_count > %s
+        )
+    ) ranked
+    WHERE position <= %s
+"""
+
+
+def rebuild_all():
+    """
+    Пересобирает ленты всех пользователей одним INSERT … SELECT.
+
+    Популярные авторы определяются по AuthorStats, поэтому счётчики
+    должны быть уже пересчитаны.
+    """
+    quote = connection.ops.quote_name
+    sql = FILL_SQL.format(
+        entries=quote(TimelineEntry._meta.db_table),
+        follows=quote(Follow._meta.db_table),
+        posts=quote(Post._meta.db_table),
+        stats=quote(AuthorStats._meta.db_table),
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [fanout_limit(), timeline_length()])
+
+
+def follow_feed(user):
+    """
+    Посты ленты подписок в порядке ``FOLLOW_ORDERING``.
+
+    Ключ сортировки — дата и id поста из записи ленты, чтобы страницы
+    читались по индексу TimelineEntry. Если в подписках есть популярные
+    авторы, ключ берётся из самих постов.
+    """
+    celebrities = celebrity_ids(user)
+    if not celebrities:
+        posts = Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post_id'),
+        )
+    else:
+        posts = Post.objects.filter(
+            Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+            | Q(author_id__in=celebrities)
+        ).annotate(feed_date=F('pub_date'), feed_post=F('pk'))
+    return posts.order_by(*FOLLOW_ORDERING)
@@ -0,0 +1,93 @@
+"""
+Подписки пользователя как множество id авторов.
+
+Множество читается из кеша (или одним запросом) не чаще раза за запрос
+и хранится на объекте пользователя, поэтому ``is_following`` для любого
+числа авторов на странице не стоит дополнительных запросов. Сигналы
+Follow сбрасывают кеш при подписке и отписке.
+
+``follow`` и ``unfollow`` меняют подписку одним INSERT … ON CONFLICT DO
+NOTHING или DELETE, опираясь на уникальность пары (user, author), а
+сигналы Follow отправляют сами, только если строка действительно
+появилась или исчезла.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Follow
+
+
+def _key(user_id):
+    return f'following:{user_id}'
+
+
+def _cache():
+    return caches[settings.FOLLOW_STATE_CACHE]
+
+
+def followed_ids(user):
+    """Множество id авторов, на которых подписан ``user``."""
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_followed_ids', None)
+    if ids is None:
+        ids = _cache().get(_key(user.pk))
+        if ids is None:
+            ids = frozenset(
+                Follow.objects.filter(user_id=user.pk)
+                .values_list('author_id', flat=True)
+            )
+            _cache().set(_key(user.pk), ids, settings.FOLLOW_STATE_TIMEOUT)
+        user._followed_ids = ids
+    return ids
+
+
+def is_following(user, author):
+    author_id = getattr(author, 'pk', author)
+    return author_id in followed_ids(user)
+
+
+def invalidate(user_id):
+    # Второй сброс после фиксации: параллельный запрос мог успеть
+    # закешировать состояние, прочитанное до неё
+    _cache().delete(_key(user_id))
+    transaction.on_commit(lambda: _cache().delete(_key(user_id)))
+
+
+def follow(user, author_id):
+    """Подписывает ``user`` на автора; True, если подписки ещё не было."""
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{Follow._meta.db_table} (user_id, author_id) VALUES (%s, %s) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            [user.pk, author_id],
+        )
+        created = cursor.rowcount == 1
+    if created:
+        post_save.send(
+            sender=Follow, created=True, update_fields=None, raw=False,
+            instance=Follow(user_id=user.pk, author_id=author_id),
+            using=connection.alias,
+        )
+    return created
+
+
+def unfollow(user, author_id):
+    """Отписывает ``user`` от автора; True, если подписка была."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Follow._meta.db_table} '
+            'WHERE user_id = %s AND author_id = %s',
+            [user.pk, author_id],
+        )
+        deleted = cursor.rowcount == 1
+    if deleted:
+        post_delete.send(
+            sender=Follow, using=connection.alias,
+            instance=Follow(user_id=user.pk, author_id=author_id),
+        )
+    return deleted
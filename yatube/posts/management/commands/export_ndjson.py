@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в ndjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--after', help='курсор строки, после которой продолжить'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE,
+            help='сколько строк читать из базы за раз',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            lines = export.ndjson(
+                options['kind'], options['after'], options['chunk_size']
+            )
+        except export.InvalidCursor:
+            raise CommandError('Неверный курсор')
+        for line in lines:
+            self.stdout.write(line, ending='')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:30
+
+from django.db import migrations
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_index(apps, schema_editor):
+    # Виртуальная таблица есть только в SQLite, для других СУБД
+    # используется поиск без индекса
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+        "text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    Post = apps.get_model('posts', 'Post')
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text) '
+        f'SELECT id, text FROM {Post._meta.db_table}'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
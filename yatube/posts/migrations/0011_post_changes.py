@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:15
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_pub_date(apps, schema_editor):
+    # Существующие посты не редактировались с момента публикации
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.PositiveIntegerField(db_index=True, verbose_name='Пост')),
+                ('kind', models.CharField(choices=[('created', 'Создан'), ('updated', 'Изменён'), ('deleted', 'Удалён')], max_length=7, verbose_name='Изменение')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
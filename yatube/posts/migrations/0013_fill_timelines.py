@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import migrations
+
+# Последние FEED_TIMELINE_LENGTH постов авторов из подписок каждого
+# пользователя; посты популярных авторов (подписчиков больше
+# FEED_FANOUT_LIMIT) в ленты не копируются
+FILL_SQL = """
+    INSERT INTO {entries} (user_id, post_id, pub_date)
+    SELECT user_id, post_id, pub_date FROM (
+        SELECT follow.user_id AS user_id, post.id AS post_id,
+            post.pub_date AS pub_date, ROW_NUMBER() OVER (
+                PARTITION BY follow.user_id
+                ORDER BY post.pub_date DESC, post.id DESC
+            ) AS position
+        FROM {follows} follow
+        JOIN {posts} post ON post.author_id = follow.author_id
+        WHERE follow.author_id NOT IN (
+            SELECT author_id FROM {follows}
+            GROUP BY author_id
+            HAVING COUNT(*) > %s
+        )
+    ) ranked
+    WHERE position <= %s
+"""
+
+
+def fill_timelines(apps, schema_editor):
+    # Подписки, появившиеся до материализованной ленты, иначе остались бы
+    # с пустой лентой до следующего поста автора
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    quote = schema_editor.connection.ops.quote_name
+    TimelineEntry.objects.all().delete()
+    schema_editor.execute(
+        FILL_SQL.format(
+            entries=quote(TimelineEntry._meta.db_table),
+            follows=quote(Follow._meta.db_table),
+            posts=quote(Post._meta.db_table),
+        ),
+        [settings.FEED_FANOUT_LIMIT, settings.FEED_TIMELINE_LENGTH],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_timeline_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def create_missing(apps, schema_editor):
+    # Строка счётчиков теперь создаётся вместе с пользователем; заводим её
+    # и тем, у кого её ещё нет, чтобы подписка не пересчитывала её на лету
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+
+    def total(model, field):
+        subquery = (
+            model.objects.filter(**{field: OuterRef('user_id')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=1000,
+    )
+    AuthorStats.objects.update(
+        posts_count=total(Post, 'author'),
+        followers_count=total(Follow, 'author'),
+        following_count=total(Follow, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_fill_timelines'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing, migrations.RunPython.noop),
+    ]
@@ -5,12 +5,63 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для ленты: автор и группа одним JOIN, только нужные поля."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_display(self):
+        """Комментарии для страницы поста вместе с именем автора."""
+        return self.select_related('author').only(
+            'text', 'created', 'post', 'author', 'author__username',
+        )
+
+
+class CountersModel(models.Model):
+    """
+    Модель с денормализованными счётчиками ``counter_fields``.
+
+    Счётчики меняет только атомарный UPDATE из ``posts.counters``, поэтому
+    сохранение уже существующего объекта записывает все поля, кроме них:
+    иначе устаревшее значение из памяти затёрло бы чужие изменения.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields is None and not force_insert and (
+            not self._state.adding
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.counter_fields
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
+
+class Post(CountersModel):
     text = models.TextField(
         help_text="Заполнение данного поля является обязательным",
         verbose_name="Текст поста",
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -28,19 +79,49 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    counter_fields = ('comments_count',)
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         default_related_name = 'posts'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+        ]
 
 
-class Group(models.Model):
+class Group(CountersModel):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, null=False, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('posts_count',)
 
     def __str__(self):
         return self.title
@@ -64,8 +145,17 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
+        ordering = ['created']
         default_related_name = 'comments'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -86,3 +176,83 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_author_user_following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    Пост в материализованной ленте подписок пользователя.
+
+    ``pub_date`` копируется из поста, чтобы лента сортировалась по индексу
+    записей, а не по соединению с постами.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_user_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class PostChange(models.Model):
+    """Запись журнала изменений постов; курсор журнала — id записи."""
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    KINDS = (
+        (CREATED, 'Создан'),
+        (UPDATED, 'Изменён'),
+        (DELETED, 'Удалён'),
+    )
+
+    # Не внешний ключ: запись об удалении переживает сам пост
+    post_id = models.PositiveIntegerField('Пост', db_index=True)
+    kind = models.CharField('Изменение', max_length=7, choices=KINDS)
+    changed_at = models.DateTimeField('Время изменения', auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.post_id}'
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, поддерживаемые сигналами."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    def __str__(self):
+        return f'Счётчики {self.user_id}'
@@ -0,0 +1,233 @@
+"""Постраничный вывод лент: по номеру страницы и по курсору (keyset)."""
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+POSTS_PER_PAGE = 10
+
+FEED_ORDERING = ('-pub_date', '-pk')
+
+COMMENTS_PER_PAGE = 20
+
+# Комментарии читаются от старых к новым
+COMMENT_ORDERING = ('created', 'pk')
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class FeedPaginator(Paginator):
+    """
+    Номерной паджинатор, который умеет строить курсоры по строкам страницы.
+
+    Ссылки «вперёд» и «назад» ведут в курсорный режим, поэтому номера
+    (и COUNT(*)) нужны только для списка страниц. ``numbered=False`` —
+    лента без номеров: первая страница читается с одной лишней строкой,
+    по которой видно, есть ли следующая.
+    """
+
+    numbered = True
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def get_cursor(self, row):
+        return encode_cursor([self._value(row, name) for name in self.fields])
+
+    def first_page(self):
+        """Первая страница без COUNT(*) и без списка номеров."""
+        rows = list(self.object_list[:self.per_page + 1])
+        self.count = len(rows)
+        self.numbered = False
+        return self._get_page(rows[:self.per_page], 1, self)
+
+    def _value(self, row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+
+class CursorPaginator(FeedPaginator):
+    """
+    Паджинатор по ключу сортировки вместо OFFSET.
+
+    Страница выбирается условием «строго после/до курсора» по полям
+    ``ordering``, поэтому глубокие страницы стоят столько же, сколько
+    первая, а COUNT(*) не выполняется вовсе.
+    """
+
+    numbered = False
+
+    def page(self, after=None, before=None):
+        return CursorPage(self, after=after, before=before)
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor or '')
+        if values is None or len(values) != len(self.fields):
+            return None
+        try:
+            parsed = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValidationError, LookupError, TypeError, ValueError):
+            return None
+        # Ключи сортировки не бывают NULL, а с None фильтр не построить
+        return None if None in parsed else parsed
+
+    def _field(self, name):
+        # Сортировать можно и по аннотации, например по рангу поиска
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def _seek(self, values, backwards):
+        """Условие «строка лежит за курсором» для составного ключа."""
+        conditions = []
+        for i, name in enumerate(self.ordering):
+            descending = name.startswith('-')
+            lookup = 'gt' if descending == backwards else 'lt'
+            equal = dict(zip(self.fields[:i], values[:i]))
+            equal[f'{self.fields[i]}__{lookup}'] = values[i]
+            conditions.append(Q(**equal))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def _fetch(self, values, backwards):
+        ordering = self.ordering
+        if backwards:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            ]
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        return rows, has_more
+
+
+class CursorPage(Page):
+    """Страница курсорной ленты; строки выбираются при первом обращении."""
+
+    is_cursor = True
+
+    def __init__(self, paginator, after=None, before=None):
+        self.paginator = paginator
+        self.number = None
+        self._backwards = before is not None
+        self.cursor = before if self._backwards else after
+        self._values = paginator._parse(self.cursor)
+
+    def __repr__(self):
+        direction = 'before' if self._backwards else 'after'
+        return f'<Cursor page {direction} {self.cursor or "-"}>'
+
+    @cached_property
+    def _result(self):
+        return self.paginator._fetch(self._values, self._backwards)
+
+    @cached_property
+    def object_list(self):
+        return self._result[0]
+
+    def has_next(self):
+        if self._backwards:
+            return self._values is not None
+        return self._result[1]
+
+    def has_previous(self):
+        if self._backwards:
+            return self._result[1]
+        return self._values is not None
+
+    @property
+    def next_cursor(self):
+        return next_cursor(self)
+
+    @property
+    def previous_cursor(self):
+        return previous_cursor(self)
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+def next_cursor(page):
+    """Курсор ``?after=`` для следующей страницы или None."""
+    if page.has_next() and len(page):
+        return page.paginator.get_cursor(page[-1])
+    return None
+
+
+def previous_cursor(page):
+    """Курсор ``?before=`` для предыдущей страницы или None."""
+    if page.has_previous() and len(page):
+        return page.paginator.get_cursor(page[0])
+    return None
+
+
+def page_query(request):
+    """
+    Параметры запроса без номера страницы и курсора — префикс для ссылок
+    паджинатора, чтобы переходы сохраняли поиск и фильтры.
+    """
+    params = request.GET.copy()
+    for name in ('page', 'after', 'before'):
+        params.pop(name, None)
+    query = params.urlencode()
+    return f'{query}&' if query else ''
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE, count=None,
+             numbered=True, ordering=FEED_ORDERING):
+    """
+    Возвращает страницу ленты.
+
+    ``?after=``/``?before=`` включают курсорный режим (``before`` без
+    значения — последняя страница), иначе используется ``?page=``.
+    Известное заранее ``count`` избавляет номерной режим от COUNT(*).
+    Ленты без списка номеров (``numbered=False``) открываются первой
+    страницей без COUNT(*), дальше листаются курсорами.
+    ``ordering`` — ключ курсоров, он же сортировка ``object_list``.
+    Снимок ленты (``snapshots.Snapshot``) листается по номерам сам,
+    а в курсорном режиме — через свой queryset.
+    """
+    if 'after' in request.GET or 'before' in request.GET:
+        queryset = getattr(object_list, 'queryset', object_list)
+        return CursorPaginator(queryset, per_page, ordering).page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    paginator = FeedPaginator(object_list, per_page, ordering)
+    if not numbered:
+        return paginator.first_page()
+    if count is not None:
+        paginator.count = count
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,74 @@
+"""
+Группы и пользователи по slug и имени из URL.
+
+Найденные объекты и отметки «не найдено» хранятся в кеше по умолчанию
+(LRU процесса перед общим кешем), поэтому повторные запросы к группе,
+профилю и подпискам — в том числе с несуществующими именами — не
+обращаются к базе. Сигналы сбрасывают записи при создании,
+переименовании и удалении. Пользователь кешируется только с полями для
+отображения, без пароля и прочих данных.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db_routers import use_primary
+
+from .models import Group, User
+
+# Отметка «не найдено»: None кеш возвращает и для отсутствующего ключа
+MISSING = 0
+
+USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def _group_key(slug):
+    return f'resolve-group:{slug}'
+
+
+def _user_key(username):
+    return f'resolve-user:{username}'
+
+
+def _resolve(key, lookup):
+    found = cache.get(key)
+    if found is None:
+        # Из основной базы: только что созданный объект мог ещё не дойти
+        # до реплики, и отметка «не найдено» закрепилась бы в кеше
+        with use_primary():
+            found = lookup() or MISSING
+        cache.set(
+            key, found,
+            settings.RESOLVER_TIMEOUT if found
+            else settings.RESOLVER_MISSING_TIMEOUT,
+        )
+    return found or None
+
+
+def group(slug):
+    """Группа со slug ``slug`` или None."""
+    return _resolve(
+        _group_key(slug),
+        lambda: Group.objects.filter(slug=slug).order_by().first(),
+    )
+
+
+def user(username):
+    """Пользователь с именем ``username`` (только USER_FIELDS) или None."""
+    # Такое имя не может существовать, а пробелы в ключе кеша недопустимы
+    if not User.username_validator.regex.search(username):
+        return None
+    return _resolve(
+        _user_key(username),
+        lambda: (
+            User.objects.filter(username=username)
+            .only(*USER_FIELDS).order_by().first()
+        ),
+    )
+
+
+def forget_group(*slugs):
+    cache.delete_many([_group_key(slug) for slug in slugs if slug])
+
+
+def forget_user(*usernames):
+    cache.delete_many([_user_key(name) for name in usernames if name])
@@ -0,0 +1,124 @@
+"""
+Полнотекстовый поиск по постам.
+
+Поиск идёт по инвертированному индексу, а не по ``LIKE '%…%'``, поэтому
+его время не растёт вместе с таблицей постов. Индекс обновляют сигналы
+сохранения и удаления ``Post``. Бэкенд выбирается настройкой
+``POST_SEARCH_BACKEND``: ``Fts5Backend`` использует виртуальную таблицу
+SQLite FTS5, а ``SimpleBackend`` годится для других СУБД, пока для них
+нет своего индекса.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+# Лучшие совпадения первыми, при равенстве — более новые посты
+SEARCH_ORDERING = ('rank', '-pk')
+
+FTS_TABLE = 'posts_post_fts'
+
+NO_RANK = Value(0.0, output_field=FloatField())
+
+
+def terms(query):
+    """Слова запроса без операторов и кавычек."""
+    return re.findall(r'\w+', query or '')
+
+
+class BaseBackend(ABC):
+    """Общая часть бэкендов: разбор запроса и пустая выдача без слов."""
+
+    def search(self, query, queryset=None):
+        """
+        Посты, подходящие под запрос, с аннотацией ``rank``.
+
+        Чем меньше ``rank``, тем выше пост в выдаче.
+        """
+        if queryset is None:
+            queryset = Post.objects.all()
+        words = terms(query)
+        if not words:
+            return queryset.annotate(rank=NO_RANK).none()
+        return self.filter(queryset, words)
+
+    @abstractmethod
+    def filter(self, queryset, words):
+        """Посты ``queryset`` со всеми словами ``words`` и аннотацией rank."""
+
+    def index(self, post):
+        """Обновляет пост в индексе; бэкенду без индекса делать нечего."""
+
+    def remove(self, post_id):
+        """Удаляет пост из индекса."""
+
+    def rebuild(self):
+        """Строит индекс заново по всем постам."""
+
+
+class SimpleBackend(BaseBackend):
+    """Поиск без индекса: все слова должны входить в текст поста."""
+
+    def filter(self, queryset, words):
+        for word in words:
+            queryset = queryset.filter(text__icontains=word)
+        return queryset.annotate(rank=NO_RANK)
+
+
+class Fts5Backend(BaseBackend):
+    """
+    Индекс в виртуальной таблице SQLite FTS5 (создаётся миграцией).
+
+    ``rowid`` записи индекса совпадает с ``id`` поста, ранжирование —
+    встроенная в FTS5 функция bm25.
+    """
+
+    def match(self, words):
+        # Каждое слово в кавычках, чтобы запрос не разбирался как
+        # синтаксис FTS5, и со звёздочкой для поиска по началу слова
+        return ' '.join('"{}"*'.format(word) for word in words)
+
+    def filter(self, queryset, words):
+        post_table = queryset.model._meta.db_table
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = {post_table}.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[self.match(words)],
+        ).annotate(
+            rank=RawSQL(f'{FTS_TABLE}.rank', (), output_field=FloatField())
+        )
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+                'VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+
+def get_backend():
+    return import_string(settings.POST_SEARCH_BACKEND)()
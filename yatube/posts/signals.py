@@ -0,0 +1,159 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import (
+    changes, counters, feed_cache, feeds, follow_state, resolver, search,
+    thumbnails,
+)
+from .models import Comment, Follow, Group, Post, PostChange, User
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Группа и картинка на момент загрузки: нужны, чтобы заметить
+    # их смену в post_edit
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        feeds.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+    elif instance._loaded_group_id != instance.group_id:
+        counters.change_group(instance._loaded_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    scopes = [
+        feed_cache.ALL_POSTS, feed_cache.author_scope(instance.author_id)
+    ]
+    for group_id in {instance.group_id, instance._loaded_group_id} - {None}:
+        scopes.append(feed_cache.group_scope(group_id))
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_init, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.ALL_GROUPS, feed_cache.group_scope(instance.pk))
+    resolver.forget_group(instance.slug, instance._loaded_slug)
+    instance._loaded_slug = instance.slug
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw, **kwargs):
+    # Строка счётчиков есть у каждого пользователя, поэтому подписка и
+    # первый пост обходятся атомарным UPDATE без пересчёта
+    if created and not raw:
+        counters.create_author(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    # Заодно снимает отметку «не найдено» с имени нового пользователя
+    resolver.forget_user(instance.username, instance._loaded_username)
+    instance._loaded_username = instance.username
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post(instance.post_id, 1)
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author(instance.author_id, 'followers_count', 1)
+        counters.change_author(instance.user_id, 'following_count', 1)
+        feeds.backfill(instance.user_id, instance.author_id)
+        feed_cache.bump(
+            feed_cache.follows_scope(instance.user_id),
+            feed_cache.follows_scope(instance.author_id),
+        )
+    follow_state.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, 'followers_count', -1)
+    counters.change_author(instance.user_id, 'following_count', -1)
+    feeds.remove_author(instance.user_id, instance.author_id)
+    feeds.refill_author(instance.author_id)
+    feed_cache.bump(
+        feed_cache.follows_scope(instance.user_id),
+        feed_cache.follows_scope(instance.author_id),
+    )
+    follow_state.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def prepare_thumbnails(sender, instance, created, **kwargs):
+    image = instance.image.name
+    if image and (created or image != instance._loaded_image):
+        thumbnails.schedule(image)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def log_saved_post(sender, instance, created, **kwargs):
+    changes.record(
+        instance.pk, PostChange.CREATED if created else PostChange.UPDATED
+    )
+
+
+@receiver(post_delete, sender=Post)
+def log_deleted_post(sender, instance, **kwargs):
+    changes.record(instance.pk, PostChange.DELETED)
+
+
+@receiver(post_save, sender=Post)
+def remember_saved_group(sender, instance, **kwargs):
+    # Подключён последним: обработчики выше ещё видят прежние значения
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_image = instance.image.name
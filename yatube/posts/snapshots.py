@@ -0,0 +1,67 @@
+"""
+Снимки лент групп.
+
+Снимок — id первых ``GROUP_SNAPSHOT_SIZE`` постов группы и их общее
+число. Он хранится в кеше под версией группы из ``feed_cache``, поэтому
+сигналы, которые уже увеличивают версию при сохранении и удалении поста
+или смене его группы, заодно выводят из оборота и старый снимок. Страница
+в пределах снимка — одна выборка по первичному ключу, дальше лента
+читается обычным запросом с OFFSET.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db_routers import use_primary
+
+from .models import Group, Post
+
+
+class Snapshot:
+    """
+    Лента для Paginator: срезы в пределах снимка выбираются по id.
+
+    Курсорный режим ``paginate`` работает с ``queryset`` напрямую.
+    """
+
+    def __init__(self, queryset, ids, count):
+        self.queryset = queryset
+        self.ids = ids
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and index.stop is not None and (
+            index.stop <= len(self.ids) or len(self.ids) == self.count
+        ):
+            return self.queryset.filter(pk__in=self.ids[index])
+        return self.queryset[index]
+
+
+def _build(group):
+    size = settings.GROUP_SNAPSHOT_SIZE
+    ids = list(
+        Post.objects.filter(group_id=group.pk)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', flat=True)[:size]
+    )
+    if len(ids) < size:
+        return ids, len(ids)
+    count = Group.objects.filter(pk=group.pk).values_list(
+        'posts_count', flat=True
+    )
+    return ids, count.first() or len(ids)
+
+
+def group_feed(group, version):
+    """Посты группы для ``paginate`` по снимку версии ``version``."""
+    key = f'group-snapshot:{version}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        # Снимок живёт до смены версии: реплика могла отстать
+        with use_primary():
+            snapshot = _build(group)
+        cache.set(key, snapshot, settings.FEED_CACHE_TIMEOUT)
+    ids, count = snapshot
+    return Snapshot(group.posts.for_feed(), ids, count)
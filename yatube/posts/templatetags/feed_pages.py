@@ -0,0 +1,17 @@
+from django import template
+
+from posts import pagination
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    """``{{ page_obj|next_cursor }}`` — курсор для ссылки «Следующая»."""
+    return pagination.next_cursor(page) or ''
+
+
+@register.filter
+def previous_cursor(page):
+    """``{{ page_obj|previous_cursor }}`` — курсор для ссылки «Предыдущая»."""
+    return pagination.previous_cursor(page) or ''
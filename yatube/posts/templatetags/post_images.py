@@ -0,0 +1,38 @@
+from django import template
+
+from posts.thumbnails import ready_thumbnail, ready_thumbnails, schedule
+
+register = template.Library()
+
+
+def page_thumbnails(page, size):
+    # Миниатюры всей страницы читаются один раз, при выводе первого поста
+    resolved = page.__dict__.setdefault('_thumbnails', {})
+    if size not in resolved:
+        resolved[size] = ready_thumbnails(
+            [post.image for post in page], size
+        )
+    return resolved[size]
+
+
+@register.simple_tag(takes_context=True)
+def post_thumbnail(context, image, size='post'):
+    """
+    Готовая миниатюра картинки поста или None, пока она готовится.
+
+    В списках с ``page_obj`` хранилище sorl опрашивается одним пакетом
+    на всю страницу, а не отдельно для каждого поста. Если миниатюры
+    нет, картинка снова ставится в очередь: задача могла потеряться при
+    перезапуске процесса.
+    """
+    if not image:
+        return None
+    page = context.get('page_obj')
+    found = page_thumbnails(page, size) if page is not None else {}
+    if image.name in found:
+        thumbnail = found[image.name]
+    else:
+        thumbnail = ready_thumbnail(image, size)
+    if thumbnail is None:
+        schedule(image.name)
+    return thumbnail
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, PostChange
+
+User = get_user_model()
+
+
+@override_settings(CHANGES_SAFETY_LAG=0)
+class PostChangesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.author = User.objects.create_user('author')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def changes(self, **params):
+        response = self.client.get(reverse('posts:post_changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_edit_updates_timestamp(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        pub_date, updated_at = post.pub_date, post.updated_at
+        post.text = 'Исправленный пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertGreater(post.updated_at, updated_at)
+
+    def test_log_follows_cursor(self):
+        """Создание, правка и удаление читаются по порядку с курсора."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        first = self.changes()
+        self.assertEqual(
+            [(c['post_id'], c['kind']) for c in first['changes']],
+            [(post.pk, PostChange.CREATED)],
+        )
+
+        post.save()
+        pk = post.pk
+        post.delete()
+        page = self.changes(after=first['next_cursor'], limit=1)
+        self.assertEqual(
+            [(c['post_id'], c['kind']) for c in page['changes']],
+            [(pk, PostChange.UPDATED)],
+        )
+        page = self.changes(after=page['next_cursor'])
+        self.assertEqual(
+            [(c['post_id'], c['kind']) for c in page['changes']],
+            [(pk, PostChange.DELETED)],
+        )
+        empty = self.changes(after=page['next_cursor'])
+        self.assertEqual(empty['changes'], [])
+        self.assertEqual(empty['next_cursor'], page['next_cursor'])
+
+    @override_settings(CHANGES_SAFETY_LAG=10)
+    def test_fresh_changes_wait_for_lag(self):
+        """Свежие записи и всё после них отдаются только после запаса."""
+        first = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        PostChange.objects.filter(post_id=first.pk).update(
+            changed_at=timezone.now() - timedelta(seconds=11)
+        )
+        page = self.changes()
+        self.assertEqual(
+            [c['post_id'] for c in page['changes']], [first.pk]
+        )
+        empty = self.changes(after=page['next_cursor'])
+        self.assertEqual(empty['changes'], [])
+        self.assertEqual(empty['next_cursor'], page['next_cursor'])
+
+    def test_access_and_cursor(self):
+        url = reverse('posts:post_changes')
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+        client = Client()
+        client.force_login(self.author)
+        self.assertEqual(client.get(url).status_code, 302)
@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    """Неизменившиеся страницы отдаются ответом 304 без отрисовки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        # Посту нужен id автора, остальные страницы проверяются по кешу
+        self.lookups = (0, 0, 0, 1)
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_not_modified(self):
+        for url, lookups in zip(self.urls, self.lookups):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(lookups):
+                    repeat = self.revalidate(url, response)
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.content, b'')
+
+    def test_changes_invalidate(self):
+        """Пост, комментарий и подписка меняют ETag своих страниц."""
+        responses = {url: self.client.get(url) for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        changed = {
+            url for url, response in responses.items()
+            if self.revalidate(url, response).status_code == 200
+        }
+        self.assertEqual(changed, set(self.urls[2:]))
+
+        responses = {url: self.client.get(url) for url in self.urls}
+        Post.objects.create(text='Ещё', author=self.author, group=self.group)
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                repeat = self.revalidate(url, response)
+                self.assertEqual(repeat.status_code, 200)
+
+    def test_bump_repeats_after_commit(self):
+        """Версия меняется и сразу, и ещё раз после фиксации транзакции."""
+        scope = feed_cache.author_scope(self.author.pk)
+        before, = feed_cache.versions(scope)
+        callbacks = len(connection.run_on_commit)
+        feed_cache.bump(scope)
+        changed, = feed_cache.versions(scope)
+        self.assertGreater(changed, before)
+        # TestCase не фиксирует транзакцию: вызываем отложенное вручную
+        for _, callback in connection.run_on_commit[callbacks:]:
+            callback()
+        committed, = feed_cache.versions(scope)
+        self.assertGreater(committed, changed)
+
+    def test_post_last_modified_from_updated_at(self):
+        """Last-Modified поста не раньше времени его правки."""
+        url = self.urls[3]
+        updated_at = timezone.now() + timedelta(hours=1)
+        Post.objects.filter(pk=self.post.pk).update(updated_at=updated_at)
+        response = self.client.get(url)
+        self.assertEqual(
+            response['Last-Modified'], http_date(updated_at.timestamp())
+        )
+
+    def test_etag_depends_on_user(self):
+        url = self.urls[0]
+        response = self.client.get(url)
+        client = Client()
+        client.force_login(self.reader)
+        repeat = self.revalidate(url, response, client)
+        self.assertEqual(repeat.status_code, 200)
+
+    def test_unknown_objects(self):
+        for url in (
+            reverse('posts:group_list', args=['nothing']),
+            reverse('posts:profile', args=['nobody']),
+            reverse('posts:post_detail', args=[self.post.pk + 1]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,150 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+
+    def stats(self, user):
+        return AuthorStats.objects.get(pk=user.pk)
+
+    def test_post_counters(self):
+        """Посты автора и группы считаются при создании, правке и удалении."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Коммент'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_save_keeps_counters(self):
+        """Сохранение загруженного ранее объекта не затирает счётчики."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Post.objects.create(text='Ещё', author=self.author, group=self.group)
+
+        post.text = 'Правка'
+        post.save()
+        group.description = 'Новое описание'
+        group.save()
+        post.refresh_from_db()
+        group.refresh_from_db()
+        self.assertEqual(post.text, 'Правка')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(group.description, 'Новое описание')
+        self.assertEqual(group.posts_count, 2)
+
+    def test_delete_user_with_posts_and_follows(self):
+        """Удаление автора не возвращает его строку счётчиков."""
+        leaving = User.objects.create_user('leaving')
+        post = Post.objects.create(
+            text='Пост', author=leaving, group=self.group
+        )
+        Comment.objects.create(post=post, author=leaving, text='Мой')
+        Comment.objects.create(post=post, author=self.reader, text='Чужой')
+        Follow.objects.create(user=self.reader, author=leaving)
+        Follow.objects.create(user=leaving, author=self.reader)
+        pk = leaving.pk
+        leaving.delete()
+        self.assertFalse(AuthorStats.objects.filter(pk=pk).exists())
+        connection.check_constraints()
+        reader = self.stats(self.reader)
+        self.assertEqual(
+            (reader.followers_count, reader.following_count), (0, 0)
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_rebuild_counters_command(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Коммент')
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.update(posts_count=0, followers_count=0)
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=0)
+
+        call_command('rebuild_counters', stdout=StringIO())
+
+        stats = self.stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_pages_do_not_count(self):
+        """Профиль и страница поста обходятся без COUNT(*)."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        cache.clear()
+        client = Client()
+        for url in (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('posts:group_list', args=[self.group.slug]),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            for query in queries.captured_queries:
+                with self.subTest(url=url):
+                    self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,70 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.author = User.objects.create_user('author')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def export(self, kind, **params):
+        response = self.client.get(
+            reverse('posts:export', args=[kind]), params
+        )
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_streams_rows_in_cursor_order(self):
+        rows = self.export('posts')
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[0]['text'], 'Пост 0')
+        self.assertEqual(self.export('comments')[0]['text'], 'Комментарий')
+
+    def test_resume_from_cursor(self):
+        """Выгрузка продолжается после курсора последней строки."""
+        cursor = self.export('posts')[1]['cursor']
+        rows = self.export('posts', after=cursor)
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts[2:]]
+        )
+
+    def test_bad_requests(self):
+        url = reverse('posts:export', args=['posts'])
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+        response = self.client.get(reverse('posts:export', args=['users']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_staff_only(self):
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts:export', args=['posts']))
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_ndjson', 'posts', '--chunk-size', '2', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
@@ -0,0 +1,104 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from posts import feeds
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+
+    def feed(self):
+        return list(feeds.follow_feed(self.reader))
+
+    def test_post_fanned_out_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        """Подписка добавляет старые посты автора, отписка их убирает."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), posts[::-1])
+
+        follow.delete()
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(FEED_TIMELINE_LENGTH=2)
+    def test_backfill_trims_timeline(self):
+        """Лента не растёт дальше FEED_TIMELINE_LENGTH при подписке."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), posts[:0:-1])
+
+    @override_settings(FEED_TIMELINE_LENGTH=2)
+    def test_fan_out_trims_timeline(self):
+        """Новые посты вытесняют из ленты самые старые."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(4)
+        ]
+        self.assertEqual(self.feed(), posts[:1:-1])
+        self.assertEqual(TimelineEntry.objects.count(), 2)
+
+    @override_settings(FEED_TIMELINE_LENGTH=2)
+    def test_migration_fills_existing_follows(self):
+        """Миграция заполняет ленты подписок, созданных до неё."""
+        other = User.objects.create_user('other')
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author)
+            for i, author in enumerate([self.author, other, self.author])
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other)
+        TimelineEntry.objects.all().delete()
+
+        migration = import_module('posts.migrations.0013_fill_timelines')
+        # Без входа в контекст: SQLite не даёт открыть его в транзакции теста
+        migration.fill_timelines(apps, connection.schema_editor())
+        self.assertEqual(self.feed(), posts[:0:-1])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_below_limit_refills_timelines(self):
+        """Посты, вышедшие у популярного автора, не пропадают после отписки."""
+        other = User.objects.create_user('other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        follow.delete()
+        self.assertEqual(self.feed(), [post])
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.reader.pk, post.pk)],
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Посты популярного автора не копируются, а читаются напрямую."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post])
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from posts import feed_cache, feeds
+from posts.models import Comment, Follow, Group, Post, PostChange
+from posts.search import get_backend
+
+User = get_user_model()
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def ndjson(self, name, rows):
+        return self.write(
+            name, ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+
+    def test_import(self):
+        """Загрузка всех видов строк и пересчёт производных данных."""
+        users = self.write(
+            'users.csv', 'username,first_name\nleo,Лев\nreader,Читатель\n'
+        )
+        groups = self.ndjson(
+            'groups.ndjson', [{'title': 'Кошки', 'slug': 'cats'}]
+        )
+        posts = self.ndjson('posts.ndjson', [
+            {
+                'id': 100, 'text': 'Про кошек', 'author': 'leo',
+                'group': 'cats', 'pub_date': '2020-01-01T10:00:00',
+            },
+            {'id': 101, 'text': 'Без группы', 'author': 'leo'},
+        ])
+        comments = self.ndjson('comments.ndjson', [
+            {'post': 100, 'author': 'reader', 'text': 'Мяу'},
+        ])
+        follows = self.ndjson(
+            'follows.ndjson', [{'user': 'reader', 'author': 'leo'}]
+        )
+        out = StringIO()
+        call_command(
+            'import_yatube', users=users, groups=groups, posts=posts,
+            comments=comments, follows=follows, batch_size=1, stdout=out,
+        )
+        self.assertIn('posts: 2 строк', out.getvalue())
+
+        leo = User.objects.get(username='leo')
+        self.assertEqual(leo.first_name, 'Лев')
+        self.assertFalse(leo.has_usable_password())
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        self.assertEqual(leo.stats.followers_count, 1)
+        self.assertEqual(Comment.objects.get().author.username, 'reader')
+        self.assertTrue(Follow.objects.filter(author=leo).exists())
+        reader = User.objects.get(username='reader')
+        self.assertEqual(
+            list(feeds.follow_feed(reader)),
+            list(Post.objects.filter(author=leo)),
+        )
+        self.assertEqual(list(get_backend().search('кошек')), [post])
+        self.assertEqual(
+            PostChange.objects.filter(kind=PostChange.CREATED).count(), 2
+        )
+
+    def test_reimport_skips_existing_users(self):
+        users = self.write('users.csv', 'username\nleo\n')
+        call_command('import_yatube', users=users, stdout=StringIO())
+        call_command('import_yatube', users=users, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username='leo').count(), 1)
+
+    @override_settings(FEED_TIMELINE_LENGTH=2)
+    def test_refresh_rebuilds_timelines_and_versions(self):
+        """Ленты собираются с ограничением длины, страницы постов — заново."""
+        leo = User.objects.create_user('leo')
+        reader = User.objects.create_user('reader')
+        posts = self.ndjson('posts.ndjson', [
+            {
+                'id': 100 + day, 'text': f'Пост {day}', 'author': 'leo',
+                'pub_date': f'2020-01-0{day}T10:00:00',
+            }
+            for day in range(1, 4)
+        ])
+        comments = self.ndjson('comments.ndjson', [
+            {'post': 101, 'author': 'reader', 'text': 'Мяу'},
+        ])
+        follows = self.ndjson(
+            'follows.ndjson', [{'user': 'reader', 'author': 'leo'}]
+        )
+        scope = feed_cache.post_scope(101)
+        before, = feed_cache.versions(scope)
+        call_command(
+            'import_yatube', posts=posts, comments=comments,
+            follows=follows, stdout=StringIO(),
+        )
+        self.assertEqual(
+            [post.pk for post in feeds.follow_feed(reader)], [103, 102]
+        )
+        self.assertGreater(feed_cache.versions(scope)[0], before)
+        self.assertEqual(leo.timeline.count(), 0)
+
+    def test_unknown_author_loads_nothing(self):
+        """Неизвестное имя обнаруживается до записи первого пакета."""
+        User.objects.create_user('leo')
+        posts = self.ndjson('posts.ndjson', [
+            {'id': 100, 'text': 'Первый', 'author': 'leo'},
+            {'id': 101, 'text': 'Второй', 'author': 'ghost'},
+        ])
+        with self.assertRaisesMessage(CommandError, 'ghost'):
+            call_command(
+                'import_yatube', posts=posts, batch_size=1,
+                stdout=StringIO(),
+            )
+        self.assertFalse(Post.objects.exists())
+
+    def test_failure_refreshes_committed_rows(self):
+        """Ошибка в середине файла не оставляет счётчики устаревшими."""
+        leo = User.objects.create_user('leo')
+        posts = self.ndjson('posts.ndjson', [
+            {'id': 100, 'text': 'Первый', 'author': 'leo'},
+            {'id': 101, 'text': 'Второй', 'author': 'leo', 'pub_date': '?'},
+        ])
+        with self.assertRaisesMessage(CommandError, 'Неверная дата'):
+            call_command(
+                'import_yatube', posts=posts, batch_size=1,
+                stdout=StringIO(),
+            )
+        post = Post.objects.get()
+        self.assertEqual(post.pk, 100)
+        leo.stats.refresh_from_db()
+        self.assertEqual(leo.stats.posts_count, 1)
+        self.assertEqual(list(get_backend().search('Первый')), [post])
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def clear_caches():
+    # Холодный путь: ни сессии, ни пользователя, ни версий и снимков в кеше
+    for alias in ('default', 'shared'):
+        caches[alias].clear()
+
+
+# Снимок меньше группы: первая страница дочитывает счётчик постов
+@override_settings(GROUP_SNAPSHOT_SIZE=10)
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Представления укладываются в бюджет и на холодных кешах."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        clear_caches()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_pages(self):
+        post = self.post.pk
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post]),
+            reverse('posts:post_comments', args=[post]),
+            reverse('posts:search') + '?q=пост',
+            reverse('posts:follow_index'),
+            reverse('posts:export', args=['posts']),
+            reverse('posts:post_changes'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[post]),
+        ):
+            with self.subTest(url=url):
+                clear_caches()
+                self.assertQueryBudget(url)
+
+    def test_guest_pages(self):
+        client = Client()
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ):
+            with self.subTest(url=url):
+                clear_caches()
+                self.assertQueryBudget(url, client=client)
+
+    def test_writes(self):
+        author = Client()
+        author.force_login(self.author)
+        other = Group.objects.create(title='Другая', slug='other')
+        for url, data, client in (
+            (
+                reverse('posts:post_create'),
+                {'text': 'Новый пост', 'group': self.group.pk}, author,
+            ),
+            (
+                reverse('posts:post_edit', args=[self.post.pk]),
+                {'text': 'Правка', 'group': other.pk}, author,
+            ),
+            (
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': 'Ещё комментарий'}, self.client,
+            ),
+            (
+                reverse('posts:profile_unfollow', args=[self.author.username]),
+                {}, self.client,
+            ),
+            (
+                reverse('posts:profile_follow', args=[self.author.username]),
+                {}, self.client,
+            ),
+        ):
+            with self.subTest(url=url):
+                clear_caches()
+                self.assertQueryBudget(url, 'post', data, client=client)
@@ -0,0 +1,99 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import feeds
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса проверяется в SQLite')
+class QueryPlanTest(TestCase):
+    """Сортировка лент обслуживается индексами, а не временным B-деревом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(15):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        Comment.objects.create(post=post, author=cls.author, text='Коммент')
+        cls.post = post
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def assert_sorted_by_index(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        sorted_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(sorted_queries, f'{url} не сортирует строки')
+        with connection.cursor() as cursor:
+            for sql in sorted_queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                with self.subTest(url=url, sql=sql):
+                    self.assertNotIn('TEMP B-TREE', plan)
+                    self.assertIn('INDEX', plan)
+
+    def test_feeds_use_indexes(self):
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        for url in feeds:
+            self.assert_sorted_by_index(url)
+            self.assert_sorted_by_index(url + '?page=2')
+
+    def test_cursor_pages_use_indexes(self):
+        response = self.client.get(reverse('posts:index') + '?after=')
+        cursor = response.context['page_obj'].next_cursor
+        for name, args in (
+            ('posts:index', []),
+            ('posts:group_list', [self.group.slug]),
+            ('posts:profile', [self.author.username]),
+        ):
+            url = reverse(name, args=args)
+            self.assert_sorted_by_index(f'{url}?after={cursor}')
+            self.assert_sorted_by_index(f'{url}?before={cursor}')
+
+    def test_follow_feed_uses_indexes(self):
+        """Лента подписок: соединение с TimelineEntry без сортировки."""
+        self.client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        cursor = response.context['page_obj'].paginator.get_cursor(
+            response.context['page_obj'][-1]
+        )
+        self.assert_sorted_by_index(url)
+        self.assert_sorted_by_index(f'{url}?after={cursor}')
+        self.assert_sorted_by_index(f'{url}?before={cursor}')
+
+    def test_trim_followers_probes_index(self):
+        """Обрезка лент после публикации не группирует все их записи."""
+        with CaptureQueriesContext(connection) as queries:
+            feeds.trim_followers(self.author.pk)
+        sql, = [query['sql'] for query in queries.captured_queries]
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import db_routers
+from posts import feed_cache, resolver, snapshots
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ResolverTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unknown_names_cached(self):
+        """Несуществующее имя — 404, повторно без запросов к базе."""
+        url = reverse('posts:profile', args=['nobody'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolver.user('nobody'))
+            self.assertIsNone(resolver.user('no body'))
+        User.objects.create_user('nobody')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_rename_invalidates(self):
+        user = User.objects.create_user('leo', first_name='Лев')
+        group = Group.objects.create(title='Кошки', slug='cats')
+        self.assertEqual(resolver.user('leo'), user)
+        self.assertEqual(resolver.group('cats'), group)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.user('leo').first_name, 'Лев')
+
+        user.username = 'lev'
+        user.save()
+        group.slug = 'kittens'
+        group.save()
+        self.assertIsNone(resolver.user('leo'))
+        self.assertEqual(resolver.user('lev'), user)
+        self.assertIsNone(resolver.group('cats'))
+        self.assertEqual(resolver.group('kittens').title, 'Кошки')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryFillTest(TestCase):
+    """Кеши под новыми версиями заполняются из основной базы."""
+
+    def setUp(self):
+        cache.clear()
+        db_routers.reset()
+        self.addCleanup(db_routers.reset)
+        self.group = Group.objects.create(title='Кошки', slug='cats')
+        self.author = User.objects.create_user('leo')
+        Post.objects.create(text='Пост', author=self.author, group=self.group)
+        db_routers.reset()
+        self.reads = []
+        route = db_routers.PrimaryReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            alias = route(router, model, **hints)
+            # Менеджер связи спрашивает базу заранее, ещё без запроса
+            if 'instance' not in hints:
+                self.reads.append(alias)
+            return 'default'
+
+        # Вне транзакции теста чтение ушло бы на реплику
+        for patcher in (
+            mock.patch.object(
+                db_routers.PrimaryReplicaRouter, 'db_for_read', db_for_read
+            ),
+            mock.patch.object(
+                connections['default'], 'in_atomic_block', False
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_fills_read_primary(self):
+        version = feed_cache.feed_version(feed_cache.ALL_POSTS)
+        db_routers.reset()
+        group = resolver.group('cats')
+        self.assertIsNotNone(resolver.user('leo'))
+        snapshots.group_feed(group, version)
+        feed_cache.cached_count(Post.objects.all(), version)
+        self.assertEqual(set(self.reads), {'default'})
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_old_versions_read_replica(self):
+        feed_cache.feed_version(feed_cache.ALL_POSTS)
+        list(Post.objects.all())
+        self.assertEqual(self.reads, ['replica1'])
+
+    def test_fresh_versions_read_primary(self):
+        feed_cache.feed_version(feed_cache.ALL_POSTS)
+        list(Post.objects.all())
+        self.assertEqual(self.reads, ['default'])
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.search import BaseBackend, SimpleBackend, get_backend
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.other = User.objects.create_user('other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return list(response.context['page_obj'])
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        post = Post.objects.create(text='Кошки гуляют', author=self.author)
+        self.assertEqual(self.search('кошки'), [post])
+
+        post.text = 'Собаки лают'
+        post.save()
+        self.assertEqual(self.search('кошки'), [])
+        self.assertEqual(self.search('собак'), [post])
+
+        post.delete()
+        self.assertEqual(self.search('собаки'), [])
+
+    def test_ranked_results(self):
+        """Посты с большим числом совпадений выше в выдаче."""
+        once = Post.objects.create(
+            text='Кошка и длинный рассказ про всё остальное на свете',
+            author=self.author,
+        )
+        twice = Post.objects.create(text='Кошка, кошка', author=self.author)
+        self.assertEqual(self.search('кошка'), [twice, once])
+
+    def test_filters(self):
+        """Выдачу можно сузить по группе и автору."""
+        in_group = Post.objects.create(
+            text='Новости', author=self.author, group=self.group
+        )
+        by_other = Post.objects.create(text='Новости', author=self.other)
+        self.assertEqual(self.search('новости', group='group'), [in_group])
+        self.assertEqual(self.search('новости', author='other'), [by_other])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        post = Post.objects.create(text='Кошки гуляют', author=self.author)
+        self.assertEqual(self.search('кошки"(*'), [post])
+        self.assertEqual(self.search('""'), [])
+
+    def test_backend_must_implement_filter(self):
+        """Бэкенд без ``filter`` не создаётся, простой бэкенд ищет."""
+        with self.assertRaises(TypeError):
+            BaseBackend()
+        post = Post.objects.create(text='Кошки гуляют', author=self.author)
+        self.assertEqual(list(SimpleBackend().search('гуляют')), [post])
+
+    def test_keyset_pagination(self):
+        """Страницы выдачи идут по курсору без пропусков и повторов."""
+        Post.objects.bulk_create(
+            Post(text='Кошка', author=self.author) for _ in range(13)
+        )
+        get_backend().rebuild()
+        first = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        page_obj = first.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertIn('q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;after=',
+                      first.content.decode())
+        rest = self.search('кошка', after=page_obj.next_cursor)
+        self.assertEqual(len(rest), 3)
+        self.assertEqual(
+            {post.pk for post in list(page_obj) + rest},
+            set(Post.objects.values_list('pk', flat=True)),
+        )
@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import wait_thumbnails
+from posts import thumbnails
+from posts.templatetags import post_images
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author')
+        self.client = Client()
+
+    def tearDown(self):
+        # Фоновые задачи не должны писать в MEDIA_ROOT после теста
+        wait_thumbnails()
+
+    def create_post(self):
+        with mock.patch.object(thumbnails.transaction, 'on_commit') as commit:
+            post = Post.objects.create(
+                text='Пост',
+                author=self.author,
+                image=SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            )
+        # on_commit вызывают и сигналы кеша лент; здесь важна очередь миниатюр
+        scheduled = [
+            call for call in commit.call_args_list
+            if call[0][0].__module__ == thumbnails.__name__
+        ]
+        self.assertEqual(len(scheduled), 1)
+        return post
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Страница не генерирует миниатюру, а показывает заглушку."""
+        post = self.create_post()
+        url = reverse('posts:post_detail', args=[post.pk])
+
+        response = self.client.get(url)
+        self.assertContains(response, 'Изображение обрабатывается')
+        self.assertIsNone(thumbnails.ready_thumbnail(post.image))
+
+        thumbnails.generate(post.image.name)
+        thumbnail = thumbnails.ready_thumbnail(post.image)
+        self.assertIsNotNone(thumbnail)
+        content = self.client.get(url).content.decode()
+        self.assertIn(thumbnail.url, content)
+        # Версии лент сменились: старый ETag с заглушкой не подходит
+        repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 200)
+
+    def test_ready_thumbnail_refreshes_feeds(self):
+        """Готовая миниатюра видна в закешированных лентах."""
+        post = self.create_post()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        placeholder = 'Изображение обрабатывается'
+        for url in urls:
+            self.assertContains(self.client.get(url), placeholder)
+        thumbnails.generate(post.image.name)
+        thumbnail = thumbnails.ready_thumbnail(post.image)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), thumbnail.url)
+
+    def test_schedule_runs_in_background(self):
+        """Миниатюры готовятся в потоке пула, а не в потоке запроса."""
+        threads = []
+
+        def generate(name):
+            threads.append(threading.current_thread().name)
+
+        on_commit = mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func()
+        )
+        with mock.patch.object(thumbnails, 'generate', generate), on_commit:
+            thumbnails.schedule('posts/small.gif')
+            wait_thumbnails()
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('thumbnails'))
+
+    def test_missing_thumbnail_is_rescheduled(self):
+        """Потерянная задача снова ставится в очередь при показе поста."""
+        post = self.create_post()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url), mock.patch.object(
+                post_images, 'schedule'
+            ) as schedule:
+                self.client.get(url)
+                schedule.assert_called_with(post.image.name)
+        thumbnails.generate(post.image.name)
+        with mock.patch.object(post_images, 'schedule') as schedule:
+            for url in urls:
+                self.client.get(url)
+        schedule.assert_not_called()
+
+    def test_page_thumbnails_batched(self):
+        """Миниатюры страницы ленты читаются из хранилища одним запросом."""
+        posts = [self.create_post() for _ in range(3)]
+        for post in posts[:2]:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            content = self.client.get(reverse('posts:index')).content.decode()
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for post in posts[:2]:
+            self.assertIn(thumbnails.ready_thumbnail(post.image).url, content)
+        self.assertIn('Изображение обрабатывается', content)
@@ -96,9 +96,9 @@ class CacheTest(TestCase):
                 text='Текст для десяти постов',
             )
         response_1 = self.authorized_client.get('/')
-        post_9 = Post.objects.get(pk=9)
-        post_9.text = 'Измененный текст'
-        post_9.save()
+        post_9 = Post.objects.all()[1]
+        # update() не вызывает сигналов, поэтому кеш о правке не знает
+        Post.objects.filter(pk=post_9.pk).update(text='Измененный текст')
         response_2 = self.authorized_client.get('/')
         self.assertEqual(response_1.content, response_2.content,)
         cache.clear()
@@ -106,3 +106,35 @@ class CacheTest(TestCase):
         self.assertNotEqual(
             response_after_cache_clear.content, response_1.content,
         )
+
+    def test_cache_invalidation(self):
+        """ Новые и измененные посты видны в лентах сразу. """
+        group = Group.objects.create(
+            title='Группа', slug='cache', description='Описание'
+        )
+        post = Post.objects.create(
+            author=self.author, text='Первый пост', group=group
+        )
+        urls = (
+            '/',
+            f'/group/{group.slug}/',
+            f'/profile/{self.author.username}/',
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+
+        post.text = 'Измененный текст'
+        post.save()
+        Post.objects.create(
+            author=self.author, text='Второй пост', group=group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.authorized_client.get(url).content.decode()
+                self.assertIn('Измененный текст', content)
+                self.assertIn('Второй пост', content)
+
+        group.title = 'Новое название'
+        group.save()
+        content = self.authorized_client.get('/').content.decode()
+        self.assertIn('Новое название', content)
@@ -1,3 +1,4 @@
+import re
 import shutil
 import tempfile
 
@@ -6,7 +7,11 @@ from django.test import Client, TestCase, override_settings
 from django.conf import settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from .. import follow_state, pagination
 from ..forms import PostForm
 from posts.models import Post, Group, Comment, Follow
 
@@ -267,6 +272,129 @@ class PaginatorViewsTest(TestCase):
         response = self.author_client.get(reverse('posts:index') + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_paginate_cursor(self):
+        """
+        Курсорный режим: переход вперёд и назад без повторов и пропусков.
+        """
+        url = reverse('posts:index')
+        response = self.author_client.get(url + '?after=')
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+
+        response = self.author_client.get(
+            url + f'?after={first_page.next_cursor}'
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            [post.pk for post in [*first_page, *second_page]],
+            list(Post.objects.values_list('pk', flat=True)),
+        )
+
+        response = self.author_client.get(
+            url + f'?before={second_page.previous_cursor}'
+        )
+        self.assertEqual(list(response.context['page_obj']), list(first_page))
+
+    @override_settings(GROUP_SNAPSHOT_SIZE=12)
+    def test_group_snapshot_pages(self):
+        """Лента группы по снимку: страницы за его пределами тоже есть."""
+        cache.clear()
+        url = reverse('posts:group_list', args=[self.group.slug])
+        pages = [
+            self.author_client.get(url, {'page': page}).context['page_obj']
+            for page in (1, 2)
+        ]
+        self.assertEqual(pages[0].paginator.count, 13)
+        self.assertEqual(
+            [post.pk for page in pages for post in page],
+            list(self.group.posts.values_list('pk', flat=True)),
+        )
+
+    def test_group_snapshot_follows_changes(self):
+        """Смена группы поста и slug группы сразу видны на страницах."""
+        cache.clear()
+        other = Group.objects.create(title='Другая', slug='other')
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.author_client.get(url)
+        post = self.group.posts.first()
+        self.author_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': post.text, 'group': other.pk},
+        )
+        page_obj = self.author_client.get(url).context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 12)
+        self.assertNotIn(post, page_obj)
+        response = self.author_client.get(
+            reverse('posts:group_list', args=[other.slug])
+        )
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+        other.slug = 'renamed'
+        other.save()
+        response = self.author_client.get(
+            reverse('posts:group_list', args=['other'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_links_use_cursors(self):
+        """«Следующая» и «Предыдущая» ведут на курсоры, номера остаются."""
+        cache.clear()
+        url = reverse('posts:index')
+        first = self.author_client.get(url)
+        page_obj = first.context['page_obj']
+        self.assertContains(
+            first, f'?after={pagination.next_cursor(page_obj)}'
+        )
+        self.assertContains(first, '?page=2')
+        second = self.author_client.get(url, {'page': 2})
+        previous = pagination.previous_cursor(second.context['page_obj'])
+        self.assertContains(second, f'?before={previous}')
+
+    def test_bad_cursors(self):
+        """Курсор неверной формы открывает первую страницу, а не 500."""
+        post = Post.objects.filter(group=self.group).first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:post_comments', args=[post.pk]),
+        )
+        for values in ([[1], 1], [None, None], ['завтра', 'x'], [{}, 1]):
+            cursor = pagination.encode_cursor(values)
+            for url in urls:
+                with self.subTest(url=url, values=values):
+                    cache.clear()
+                    response = self.author_client.get(url, {'after': cursor})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_follow_index_without_count(self):
+        """Лента подписок открывается без COUNT(*) и без номеров страниц."""
+        reader = User.objects.create_user(username='reader-p')
+        Follow.objects.create(user=reader, author=self.author)
+        client = Client()
+        client.force_login(reader)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('posts:follow_index'))
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertTrue(page_obj.has_next())
+        self.assertContains(
+            response, f'?after={pagination.next_cursor(page_obj)}'
+        )
+        self.assertNotContains(response, '?page=2')
+
+    def test_paginate_cursor_last_page(self):
+        """Пустой ?before= открывает последнюю страницу ленты."""
+        response = self.author_client.get(reverse('posts:index') + '?before=')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertTrue(page_obj.has_previous())
+        self.assertFalse(page_obj.has_next())
+
 
 class CommentTest(TestCase):
     @classmethod
@@ -311,6 +439,61 @@ class CommentTest(TestCase):
         self.assertEqual(response.context['comments'][0], self.comment)
 
 
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {i}'
+            )
+
+    def test_first_page_rendered(self):
+        """На странице поста выводится только первая страница комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, f'?after={comments.next_cursor}')
+
+    def test_next_page_fragment_and_json(self):
+        """Следующие комментарии отдаются фрагментом и в JSON."""
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        cursor = self.client.get(url).context['comments'].next_cursor
+
+        response = self.client.get(url, {'after': cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertContains(response, 'Комментарий 24')
+        self.assertNotContains(response, 'Комментарий 19<')
+        self.assertNotContains(response, 'data-comments-more')
+
+        data = self.client.get(
+            url, {'after': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            [f'Комментарий {i}' for i in range(20, 25)],
+        )
+        self.assertIsNone(data['next_cursor'])
+
+    def test_unknown_post(self):
+        """Для несуществующего поста возвращается 404."""
+        response = self.client.get(reverse('posts:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+TABLE_RE = re.compile(r'(?:FROM|INTO)\s+"?(\w+)')
+
+
+def main_table(sql):
+    """Первая таблица после FROM или INTO — та, которую читает или пишет."""
+    match = TABLE_RE.search(sql)
+    return match and match.group(1)
+
+
 class FollowTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -354,3 +537,167 @@ class FollowTest(TestCase):
         response = self.author_client.get('/follow/')
         post_none = response.context['page_obj']
         self.assertNotIn(post, post_none,)
+
+    def test_profile_following_flag(self):
+        """Флаг подписки относится к открытому профилю и меняется сразу."""
+        other = User.objects.create_user('other')
+        Follow.objects.create(user=self.user, author=other)
+
+        def following(author):
+            response = self.authorized_client.get(
+                reverse('posts:profile', args=[author.username])
+            )
+            return response.context['following']
+
+        self.assertTrue(following(other))
+        self.assertFalse(following(self.author))
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertTrue(following(self.author))
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(following(self.author))
+
+    def test_follow_state_loaded_once(self):
+        """Подписки читаются один раз на пользователя и затем из кеша."""
+        Follow.objects.create(user=self.user, author=self.author)
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertTrue(follow_state.is_following(self.user, self.author))
+            self.assertFalse(follow_state.is_following(self.user, self.user))
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_state.is_following(user, self.author))
+
+    def post_json(self, name, username=None):
+        return self.authorized_client.post(
+            reverse(name, args=[username or self.author.username]),
+            HTTP_ACCEPT='application/json',
+        ).json()
+
+    def test_follow_json(self):
+        """POST с Accept: json отвечает состоянием и числом подписчиков."""
+        for _ in range(2):
+            self.assertEqual(
+                self.post_json('posts:profile_follow'),
+                {'following': True, 'followers_count': 1},
+            )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        for _ in range(2):
+            self.assertEqual(
+                self.post_json('posts:profile_unfollow'),
+                {'following': False, 'followers_count': 0},
+            )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_self_and_unknown(self):
+        """На себя подписаться нельзя, неизвестный автор — 404."""
+        self.assertEqual(
+            self.post_json('posts:profile_follow', self.user.username),
+            {'following': False, 'followers_count': 0},
+        )
+        self.assertFalse(Follow.objects.exists())
+        response = self.authorized_client.get(
+            reverse('posts:profile_follow', args=['nobody'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cross_site_get_not_allowed(self):
+        """GET с чужого сайта не меняет подписку, форма шлёт POST."""
+        url = reverse('posts:profile_follow', args=[self.author.username])
+        response = self.authorized_client.get(
+            url, HTTP_SEC_FETCH_SITE='cross-site'
+        )
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+        self.authorized_client.get(url, HTTP_SEC_FETCH_SITE='same-origin')
+        self.assertTrue(Follow.objects.exists())
+
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertContains(response, 'method="post"')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_follow_without_count(self):
+        """У нового пользователя уже есть счётчики: подписка без COUNT."""
+        reader = User.objects.create_user('reader')
+        client = Client()
+        client.force_login(reader)
+        with CaptureQueriesContext(connection) as queries:
+            client.post(
+                reverse('posts:profile_follow', args=[self.author.username])
+            )
+        self.assertTrue(Follow.objects.filter(user=reader).exists())
+        counts = [
+            query['sql'] for query in queries if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(counts, [])
+        self.assertEqual(reader.stats.following_count, 1)
+
+    def test_follow_single_statement(self):
+        """Подписка и отписка — один INSERT или DELETE по posts_follow."""
+        for name, verb in (
+            ('posts:profile_follow', 'INSERT'),
+            ('posts:profile_unfollow', 'DELETE'),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                self.post_json(name)
+            statements = [
+                query['sql'] for query in queries
+                if main_table(query['sql']) == 'posts_follow'
+            ]
+            with self.subTest(name=name):
+                self.assertEqual(len(statements), 1, statements)
+                self.assertTrue(statements[0].startswith(verb))
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def add_posts(self, number):
+        for i in range(number):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(post=self.post, author=post.author,
+                                   text='Коммент')
+
+    def test_query_count_is_fixed(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        self.add_posts(1)
+        few = {url: self.count_queries(url) for url in urls}
+        self.add_posts(12)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), few[url])
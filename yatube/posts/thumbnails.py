@@ -0,0 +1,161 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+После сохранения поста с новой картинкой все размеры из
+``POST_THUMBNAILS`` готовятся в пуле потоков, а шаблоны только проверяют
+хранилище sorl-thumbnail и до готовности показывают заглушку, не
+декодируя картинку во время запроса. Когда миниатюры готовы, версии лент
+с этим постом увеличиваются, иначе кешированные фрагменты и ETag так и
+отдавали бы заглушку.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDbKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.db_routers import use_primary
+
+from . import feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POST_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def thumbnail_file(image, size='post'):
+    """
+    Файл миниатюры, который создал бы ``{% thumbnail %}``.
+
+    Повторяет расчёт имени из ``ThumbnailBackend.get_thumbnail``, но
+    ничего не генерирует.
+    """
+    geometry, options = settings.POST_THUMBNAILS[size]
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def ready_thumbnail(image, size='post'):
+    """Готовая миниатюра из хранилища sorl или None."""
+    if not image:
+        return None
+    return default.kvstore.get(thumbnail_file(image, size))
+
+
+def ready_thumbnails(images, size='post'):
+    """
+    Готовые миниатюры нескольких картинок: ``{имя картинки: миниатюра}``.
+
+    Для ``cached_db``-хранилища sorl все ключи читаются одним get_many из
+    кеша, а промахи — одним запросом к таблице хранилища; отсутствующие
+    записи кешируются так же, как это делает сам sorl.
+    """
+    names = {getattr(image, 'name', image) for image in images if image}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDbKVStore):
+        return {name: ready_thumbnail(name, size) for name in names}
+    keys = {
+        add_prefix(thumbnail_file(name, size).key): name for name in names
+    }
+    found = kvstore.cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        loaded = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(loaded, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(loaded)
+    return {
+        name: (
+            None if found[key] == EMPTY_VALUE
+            else deserialize_image_file(found[key])
+        )
+        for key, name in keys.items()
+    }
+
+
+def refresh_feeds(name):
+    """Новые версии лент и страниц постов с картинкой ``name``."""
+    with use_primary():
+        posts = list(
+            Post.objects.filter(image=name).order_by()
+            .values_list('pk', 'author_id', 'group_id')
+        )
+    if not posts:
+        return
+    scopes = {feed_cache.ALL_POSTS}
+    for post_id, author_id, group_id in posts:
+        scopes.add(feed_cache.post_scope(post_id))
+        scopes.add(feed_cache.author_scope(author_id))
+        if group_id is not None:
+            scopes.add(feed_cache.group_scope(group_id))
+    feed_cache.bump(*scopes)
+
+
+def generate(name):
+    """Готовит все размеры миниатюр для картинки ``name``."""
+    try:
+        for geometry, options in settings.POST_THUMBNAILS.values():
+            get_thumbnail(name, geometry, **options)
+        refresh_feeds(name)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+    finally:
+        close_old_connections()
+
+
+def _run(name):
+    try:
+        generate(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def schedule(name):
+    """Ставит картинку в очередь после фиксации транзакции."""
+    def submit():
+        with _lock:
+            if name in _pending:
+                return
+            _pending.add(name)
+        _get_executor().submit(_run, name)
+
+    transaction.on_commit(submit)
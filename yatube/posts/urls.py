@@ -12,6 +12,18 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Поиск по постам
+    path('search/', views.search, name='search'),
+    # Подгрузка комментариев к записи
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    # Выгрузка данных для аналитики (только для персонала)
+    path('export/<str:kind>/', views.export_rows, name='export'),
+    # Журнал изменений постов для кешей и индексаторов
+    path('changes/', views.post_changes, name='post_changes'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
     path(
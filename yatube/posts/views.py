@@ -1,73 +1,201 @@
+from functools import wraps
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse,
+    StreamingHttpResponse,
+)
 
 from django.shortcuts import render, get_object_or_404, redirect
 
-from .models import Post, Group, User, Follow
+from core.profiling import query_budget
+
+from .models import AuthorStats, Post
+from . import (
+    changes, export, feed_cache, follow_state, resolver, snapshots,
+)
+from .counters import author_stats
+from .feeds import FOLLOW_ORDERING, follow_feed
+from .follow_state import is_following
 from .forms import PostForm, CommentForm
+from .pagination import (
+    COMMENT_ORDERING, COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator,
+    page_query, paginate,
+)
+from .search import SEARCH_ORDERING, get_backend
+
+
+# Области, от которых зависят страницы: по ним строятся ETag и
+# Last-Modified, и повторный запрос без изменений стоит не больше
+# одного SELECT
+def index_scopes(request):
+    return [feed_cache.ALL_POSTS, feed_cache.ALL_GROUPS]
+
+
+def group_scopes(request, slug):
+    group = resolver.group(slug)
+    if group is None:
+        return None
+    return [feed_cache.group_scope(group.pk)]
+
+
+def profile_scopes(request, username):
+    author = resolver.user(username)
+    if author is None:
+        return None
+    return [
+        feed_cache.author_scope(author.pk),
+        feed_cache.follows_scope(author.pk),
+        feed_cache.ALL_GROUPS,
+    ]
+
+
+def _post_state(request, post_id):
+    # Автор и время правки поста одним запросом на обе функции условного GET
+    if not hasattr(request, '_post_state'):
+        found = (
+            Post.objects.filter(pk=post_id).order_by()
+            .values_list('author', 'updated_at')[:1]
+        )
+        request._post_state = next(iter(found), None)
+    return request._post_state
+
+
+def post_scopes(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    author_id, _ = state
+    return [
+        feed_cache.post_scope(post_id),
+        feed_cache.author_scope(author_id),
+        feed_cache.ALL_GROUPS,
+    ]
+
+
+def post_modified(request, post_id):
+    state = _post_state(request, post_id)
+    return state and state[1]
 
 
+@query_budget(5)
+@feed_cache.conditional(index_scopes)
 def index(request):
-    post_list = Post.objects.all().select_related('author')
-    page_obj = paginator(request, post_list)
+    post_list = Post.objects.for_feed()
+    version = feed_cache.feed_version(
+        feed_cache.ALL_POSTS, feed_cache.ALL_GROUPS
+    )
+    page_obj = paginate(
+        request, post_list, count=feed_cache.cached_count(post_list, version)
+    )
     title = 'Главная страница сайта Yatube'
     context = {
         'page_obj': page_obj,
-        'title': title
+        'title': title,
+        **feed_cache.feed_context(request, version),
     }
     template = 'posts/index.html'
     return render(request, template, context)
 
 
+@query_budget(6)
+@feed_cache.conditional(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()[:10]
-    page_obj = paginator(request, posts)
+    group = resolver.group(slug)
+    if group is None:
+        raise Http404
+    version = feed_cache.feed_version(feed_cache.group_scope(group.pk))
+    page_obj = paginate(request, snapshots.group_feed(group, version))
     context = {
         'group': group,
-        'posts': posts,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        **feed_cache.feed_context(request, version),
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+@query_budget(7)
+@feed_cache.conditional(profile_scopes)
 def profile(request, username):
-    author = User.objects.get(username=username)
-    post_list = author.posts.all()
-    page_obj = paginator(request, post_list)
+    author = resolver.user(username)
+    if author is None:
+        raise Http404
+    stats = author_stats(author)
+    post_list = author.posts.for_feed()
+    page_obj = paginate(request, post_list, count=stats.posts_count)
     title = f'Профайл пользователя {username}'
-    all_posts = post_list.count()
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(
-            author__following__user=request.user
-        ).exists()
+    all_posts = stats.posts_count
+    version = feed_cache.feed_version(
+        feed_cache.author_scope(author.pk), feed_cache.ALL_GROUPS
     )
+    following = is_following(request.user, author)
     context = {
         'page_obj': page_obj,
         'title': title,
         'all_posts': all_posts,
         'author': author,
+        'stats': stats,
         'following': following,
+        **feed_cache.feed_context(request, version),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(6)
+@feed_cache.conditional(post_scopes, post_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    posts_count = author_stats(post.author).posts_count
     context = {
         'title': post.text,
         'post_count': posts_count,
         'post': post,
-        'comments': post.comments.all(),
+        'comments': comments_page(post.comments),
         'form': CommentForm(),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(comments, after=None):
+    return CursorPaginator(
+        comments.for_display(), COMMENTS_PER_PAGE, COMMENT_ORDERING
+    ).page(after=after)
+
+
+@query_budget(3)
+def post_comments(request, post_id):
+    """
+    Следующая страница комментариев для подгрузки на post_detail.
+
+    По умолчанию отдаёт HTML-фрагмент, с ``?format=json`` — данные.
+    """
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page = comments_page(post.comments, after=request.GET.get('after'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in page
+            ],
+            'next_cursor': page.next_cursor,
+        })
+    context = {'comments': page, 'post_id': post.pk}
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@query_budget(13)
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None)
@@ -83,10 +211,12 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(12)
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
@@ -102,14 +232,9 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
-def paginator(request, posts):
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
-
-
+@query_budget(8)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     post = get_object_or_404(Post, pk=post_id)
@@ -121,12 +246,78 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = Post.objects.for_feed()
+    group = request.GET.get('group')
+    if group:
+        posts = posts.filter(group__slug=group)
+    author = request.GET.get('author')
+    if author:
+        posts = posts.filter(author__username=author)
+    results = get_backend().search(query, posts)
+    page_obj = CursorPaginator(
+        results, POSTS_PER_PAGE, SEARCH_ORDERING
+    ).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'group': group,
+        'author': author,
+        'paginator_query': page_query(request),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(3)
+@staff_member_required
+def export_rows(request, kind):
+    """Выгрузка таблицы в ndjson; ``?after=`` продолжает с курсора."""
+    if kind not in export.EXPORTS:
+        raise Http404
+    try:
+        lines = export.ndjson(kind, after=request.GET.get('after'))
+    except export.InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор')
+    response = StreamingHttpResponse(
+        lines, content_type='application/x-ndjson; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}.ndjson"'
+    return response
+
+
+@query_budget(3)
+@staff_member_required
+def post_changes(request):
+    """
+    Журнал изменений постов с курсора ``?after=``.
+
+    ``?limit=`` ограничивает число записей (не больше
+    ``MAX_CHANGES_PER_PAGE``); ``next_cursor`` передаётся в следующий
+    запрос.
+    """
+    try:
+        limit = int(request.GET.get('limit', changes.CHANGES_PER_PAGE))
+        found, next_cursor = changes.since(
+            request.GET.get('after'),
+            limit=min(max(limit, 1), changes.MAX_CHANGES_PER_PAGE),
+        )
+    except ValueError:
+        return HttpResponseBadRequest('Неверный курсор или limit')
+    return JsonResponse({'changes': found, 'next_cursor': next_cursor})
+
+
+@query_budget(6)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user or None
-    ).all()
-    page_obj = paginator(request, post_list)
+    post_list = follow_feed(request.user).for_feed()
+    page_obj = paginate(
+        request, post_list, numbered=False, ordering=FOLLOW_ORDERING
+    )
     return render(
         request,
         'posts/follow.html',
@@ -135,18 +326,75 @@ def follow_index(request):
     )
 
 
+# Sec-Fetch-Site, при котором GET пришёл не с чужого сайта: переход
+# внутри сайта или набранный вручную адрес
+SAFE_FETCH_SITES = {'same-origin', 'none'}
+
+
+def post_only(view):
+    """
+    Подписка меняется POST-запросом с CSRF-токеном.
+
+    GET остаётся только для старых ссылок внутри сайта: браузер, который
+    сообщает Sec-Fetch-Site, получает 405 на GET с другого сайта, поэтому
+    чужая страница не подпишет пользователя картинкой или ссылкой.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        site = request.META.get('HTTP_SEC_FETCH_SITE')
+        if request.method != 'POST' and (
+            request.method != 'GET'
+            or site is not None and site not in SAFE_FETCH_SITES
+        ):
+            return HttpResponseNotAllowed(['POST'])
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _wants_json(request):
+    return (
+        request.method == 'POST'
+        and (
+            'application/json' in request.META.get('HTTP_ACCEPT', '')
+            or request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
+        )
+    )
+
+
+def _follow_response(request, author, following):
+    if not _wants_json(request):
+        return redirect('posts:profile', username=author.username)
+    followers = (
+        AuthorStats.objects.filter(pk=author.pk)
+        .values_list('followers_count', flat=True)
+        .first()
+    )
+    return JsonResponse({
+        'following': following,
+        'followers_count': followers or 0,
+    })
+
+
+@query_budget(12)
 @login_required
+@post_only
+@transaction.atomic
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
+    author = resolver.user(username)
+    if author is None:
+        raise Http404
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
-    return redirect('posts:profile', username=author.username)
+        follow_state.follow(request.user, author.pk)
+    return _follow_response(request, author, request.user != author)
 
 
+@query_budget(10)
 @login_required
+@post_only
+@transaction.atomic
 def profile_unfollow(request, username):
-    author = User.objects.get(username=username)
-    following = Follow.objects.filter(user=request.user, author=author)
-    if following:
-        following.delete()
-    return redirect('posts:profile', username=author.username)
+    author = resolver.user(username)
+    if author is None:
+        raise Http404
+    follow_state.unfollow(request.user, author.pk)
+    return _follow_response(request, author, False)
@@ -0,0 +1,94 @@
+"""
+Загрузка пользователя сессии из кеша.
+
+AuthenticationMiddleware на каждом запросе вызывает ``get_user`` с id из
+сессии; с этим бэкендом нужные страницам поля User читаются из общего
+кеша. Хеш пароля в кеш не попадает: вместо него хранится готовый хеш
+сессии, а остальные поля загружаются из базы при первом обращении.
+Запись сбрасывается при любом сохранении пользователя (смена пароля,
+вход, правка профиля), удалении и выходе, поэтому проверка сессии
+по-прежнему видит актуальный пароль.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.db_routers import use_primary
+
+UserModel = get_user_model()
+
+# Поля, которые читают шапка, шаблоны и проверки прав
+CACHED_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'is_active',
+    'is_staff', 'is_superuser',
+)
+
+
+def _key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _cache():
+    return caches[settings.AUTH_USER_CACHE]
+
+
+def forget(user_id):
+    # Второй сброс после фиксации: параллельный запрос мог успеть
+    # закешировать строку, прочитанную до неё
+    _cache().delete(_key(user_id))
+    transaction.on_commit(lambda: _cache().delete(_key(user_id)))
+
+
+def _load(user_id):
+    # Из основной базы: реплика могла не получить новый пароль, и
+    # устаревший хеш сессии прожил бы в кеше весь таймаут
+    with use_primary():
+        user = (
+            UserModel._default_manager.only(*CACHED_FIELDS, 'password')
+            .filter(pk=user_id).first()
+        )
+    if user is None:
+        return None
+    state = {name: getattr(user, name) for name in CACHED_FIELDS}
+    state['session_hash'] = user.get_session_auth_hash()
+    return state
+
+
+def _restore(state):
+    """Пользователь из кеша; поля вне CACHED_FIELDS догружаются из базы."""
+    # from_db ждёт значения в порядке полей модели
+    names = [
+        field.attname for field in UserModel._meta.concrete_fields
+        if field.attname in CACHED_FIELDS
+    ]
+    user = UserModel.from_db(
+        DEFAULT_DB_ALIAS, names, [state[name] for name in names]
+    )
+    session_hash = state['session_hash']
+
+    def get_session_auth_hash():
+        # Готовый хеш годится, пока пароль не загружен: после set_password()
+        # update_session_auth_hash должен сохранить в сессии уже новый
+        if 'password' not in user.__dict__:
+            return session_hash
+        return AbstractBaseUser.get_session_auth_hash(user)
+
+    user.get_session_auth_hash = get_session_auth_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        state = _cache().get(_key(user_id))
+        if state is None:
+            state = _load(user_id)
+            if state is None:
+                return None
+            _cache().set(
+                _key(user_id), state, settings.AUTH_USER_CACHE_TIMEOUT
+            )
+        user = _restore(state)
+        return user if self.user_can_authenticate(user) else None
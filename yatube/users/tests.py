@@ -1 +1,96 @@
-# Create your tests here.
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.db_routers import use_primary
+from users import backends
+
+User = get_user_model()
+
+
+# Как с REDIS_URL: сессия и пользователь читаются из общего кеша
+@override_settings(
+    AUTHENTICATION_BACKENDS=[
+        'users.backends.CachedModelBackend',
+        'django.contrib.auth.backends.ModelBackend',
+    ],
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class CachedAuthTest(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        cache.clear()
+        self.user = User.objects.create_user('leo', password='secret-pass')
+        self.client = Client()
+        self.client.login(username='leo', password='secret-pass')
+        self.url = reverse('about:author')
+
+    def test_session_and_user_from_cache(self):
+        """Повторный запрос вошедшего пользователя не обращается к базе."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_logs_out(self):
+        self.client.get(self.url)
+        self.user.set_password('new-secret-pass')
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_logout_forgets_user(self):
+        self.client.get(self.url)
+        self.client.get(reverse('users:logout'))
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_inactive_user(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_cache_has_no_password_hash(self):
+        """В кеше нужные поля и хеш сессии, но не хеш пароля."""
+        with mock.patch.object(
+            backends, 'use_primary', wraps=use_primary
+        ) as primary:
+            self.client.get(self.url)
+        primary.assert_called_once_with()
+        state = caches['shared'].get(backends._key(self.user.pk))
+        self.assertEqual(state['username'], 'leo')
+        self.assertNotIn('password', state)
+        self.assertNotIn(self.user.password, repr(state))
+
+    def test_cached_user_loads_rest_lazily(self):
+        """Пароль и остальные поля догружаются, save() их не затирает."""
+        self.client.get(self.url)
+        user = backends.CachedModelBackend().get_user(self.user.pk)
+        self.assertTrue(user.check_password('secret-pass'))
+        user.first_name = 'Лев'
+        user.save()
+        saved = User.objects.get(pk=self.user.pk)
+        self.assertEqual(saved.first_name, 'Лев')
+        self.assertEqual(saved.date_joined, self.user.date_joined)
+        self.assertTrue(saved.check_password('secret-pass'))
+
+    def test_password_change_view_keeps_session(self):
+        """После смены пароля через форму пользователь остаётся в системе."""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(self.url)
+        response = self.client.post(reverse('admin:password_change'), {
+            'old_password': 'secret-pass',
+            'new_password1': 'another-secret-42',
+            'new_password2': 'another-secret-42',
+        })
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(self.url)
+        self.assertTrue(response.context['user'].is_authenticated)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('another-secret-42'))
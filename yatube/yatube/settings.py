@@ -46,11 +46,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.SQLProfilerMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,6 +84,10 @@ TEMPLATES = [
     },
 ]
 
+# Компилировать все шаблоны при старте процесса; имеет смысл только
+# с кешируемым загрузчиком (см. settings_production)
+TEMPLATE_WARMUP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -94,6 +101,37 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения. Локально это отдельные файлы SQLite из
+# DATABASE_REPLICA_FILES (через запятую), которые нужно копировать
+# с основной базы самостоятельно; в тестах реплики зеркалят default
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICA_FILES', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name.strip()),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Профиль SQL в заголовках Server-Timing и X-SQL-Queries; в логе
+# core.profiler он пишется всегда
+SQL_PROFILER_HEADERS = DEBUG
+# Превышение @query_budget — исключение, а не предупреждение в логе.
+# Тестовый раннер включает его сам
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.testing.BudgetTestRunner'
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной базы —
+# должно перекрывать задержку репликации
+REPLICA_PIN_SECONDS = 5
+# Журнал изменений постов отдаёт только записи старше этого числа секунд:
+# запись, которая фиксируется дольше, могла бы оказаться позади курсора
+CHANGES_SAFETY_LAG = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -139,6 +177,7 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
+
 #  подключаем движок filebased.EmailBackend
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
@@ -149,8 +188,91 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Общий для всех воркеров кеш: Redis, если задан REDIS_URL, иначе память
+# процесса. Перед ним стоит небольшой LRU каждого процесса
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'core.cache_backends.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+AUTH_USER_CACHE = 'shared'
+AUTH_USER_CACHE_TIMEOUT = 60 * 15
+SESSION_CACHE_ALIAS = 'shared'
+
+if REDIS_URL:
+    # Пользователь сессии читается из общего кеша. ModelBackend остаётся
+    # для сессий, открытых до его подключения: иначе их владельцы были бы
+    # разлогинены
+    AUTHENTICATION_BACKENDS = [
+        'users.backends.CachedModelBackend',
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+    # Сессии читаются из общего кеша и записываются ещё и в базу
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    # Кеш в памяти у каждого воркера свой: выход или смена пароля сбросили
+    # бы сессию и пользователя только в одном из них, поэтому без Redis
+    # оба читаются из базы
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+# Лента подписок: авторы с большим числом подписчиков не раскладываются
+# по лентам при публикации, их посты подмешиваются при чтении
+FEED_FANOUT_LIMIT = 1000
+# Сколько последних постов хранится в материализованной ленте
+FEED_TIMELINE_LENGTH = 1000
+
+# Время жизни закешированных фрагментов лент; при изменении постов
+# и групп фрагменты сбрасываются сразу сменой версии ключа
+FEED_CACHE_TIMEOUT = 60 * 15
+# Версии лент читаются мимо LRU процесса, чтобы сброс был виден всем
+# воркерам сразу
+FEED_VERSION_CACHE = 'shared'
+
+# Снимок ленты группы: сколько первых постов читается по id из кеша;
+# дальние страницы запрашиваются из базы
+GROUP_SNAPSHOT_SIZE = 500
+
+# Группы и пользователи по slug и имени из URL; отметки о несуществующих
+# именах живут недолго
+RESOLVER_TIMEOUT = 60 * 60
+RESOLVER_MISSING_TIMEOUT = 60
+
+# Множества подписок пользователей; общий кеш, чтобы после подписки
+# другие воркеры не отдавали старое состояние из своего LRU
+FOLLOW_STATE_CACHE = 'shared'
+FOLLOW_STATE_TIMEOUT = 60 * 60
+
+# Миниатюры картинок постов готовятся заранее в фоновых потоках;
+# ключ — имя размера для тега {% post_thumbnail %}
+POST_THUMBNAILS = {
+    'post': ('960x339', {'crop': 'center', 'upscale': True}),
 }
+POST_THUMBNAIL_WORKERS = 2
+
+# Поиск по постам: FTS5 для SQLite, для других СУБД — поиск без индекса
+POST_SEARCH_BACKEND = (
+    'posts.search.Fts5Backend'
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+    else 'posts.search.SimpleBackend'
+)
@@ -0,0 +1,52 @@
+"""
+Настройки для боевого окружения:
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_production
+
+Нужны переменные окружения ``DJANGO_SECRET_KEY`` и ``REDIS_URL``.
+Шаблоны компилируются один раз кешируемым загрузчиком и прогреваются
+при старте процесса (``TEMPLATE_WARMUP``), поэтому первый запрос к
+странице не платит за разбор base.html, includes/post.html и остальных.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import ALLOWED_HOSTS, REDIS_URL, TEMPLATES
+
+DEBUG = False
+
+# Ключ из репозитория в бою не годится, а без общего кеша версии лент,
+# сессии и пользователи у каждого воркера свои, и фрагменты лент живут
+# до FEED_CACHE_TIMEOUT. Без этих переменных процесс не стартует
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Не задана переменная DJANGO_SECRET_KEY')
+if not REDIS_URL:
+    raise ImproperlyConfigured('Не задана переменная REDIS_URL')
+
+ALLOWED_HOSTS = ALLOWED_HOSTS + list(
+    filter(None, os.getenv('DJANGO_ALLOWED_HOSTS', '').split(','))
+)
+
+SQL_PROFILER_HEADERS = False
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        # Явный список загрузчиков несовместим с APP_DIRS
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+TEMPLATE_WARMUP = True